@@ -1,12 +1,53 @@
 # app.py
+import importlib
 import streamlit as st
-from modules import indicadores, comparador
-import modules.utils as utils
+from modules import telemetria
+
+# Páginas pesadas (pandas, plotly, requests, scraping_ipe): se importan solo al
+# seleccionarlas, así la portada no paga esas importaciones en cada arranque en frío.
+PAGINAS = {
+    "Indicadores": ("modules.indicadores", "mostrar_indicadores"),
+    "Comparador de propuestas": ("modules.comparador", "mostrar_comparador"),
+}
+
+
+def cargar_pagina(opcion: str):
+    modulo, funcion = PAGINAS[opcion]
+    with telemetria.span("page.import", modulo=modulo):
+        return getattr(importlib.import_module(modulo), funcion)
 
 st.set_page_config(page_title="Plataforma Ciudadana - Observatorio de Pobreza", page_icon="📊", layout="wide")
 
 st.sidebar.title("📊 Navegación")
-opcion = st.sidebar.radio("Selecciona módulo:", ["Presentación", "Indicadores", "Comparador de propuestas"])
+opcion = st.sidebar.radio("Selecciona módulo:", ["Presentación", *PAGINAS])
+
+telemetria.configure_logging()
+# La instrumentación es del proceso y solo se activa con POBREZA_PERF; el panel
+# es una vista de esta sesión y solo aparece cuando ya está activa.
+if telemetria.enabled():
+    st.sidebar.checkbox("⏱️ Panel de rendimiento", value=False, key="perf_panel",
+                        help="Tiempos por etapa (descarga, parseo, cachés, gráficos) de todo el proceso.")
+
+def mostrar_panel_rendimiento():
+    import pandas as pd
+    from modules.compartido import cache
+    snap = telemetria.snapshot()
+    mem = cache.stats()
+    with st.sidebar.expander("Rendimiento", expanded=True):
+        st.markdown(f"**Caché compartida:** {mem['mb']} / {mem['max_mb']} MB en {mem['entradas']} entrada(s), "
+                    f"{mem['expulsiones']} expulsión(es)"
+                    + (f"; RSS máx. del proceso {mem['rss_max_mb']} MB" if mem["rss_max_mb"] else ""))
+        if mem["items"]:
+            st.dataframe(pd.DataFrame(mem["items"]), width="stretch", hide_index=True)
+        if snap["caches"]:
+            st.markdown("**Cachés**")
+            st.dataframe(pd.DataFrame(snap["caches"]).T, width="stretch")
+        if snap["mas_lentos"]:
+            st.markdown("**Tramos recientes más lentos**")
+            st.dataframe(pd.DataFrame(snap["mas_lentos"]).drop(columns=["ts"]), width="stretch")
+        if snap["tramos"]:
+            st.markdown("**Tiempo acumulado por tramo**")
+            st.dataframe(pd.DataFrame(snap["tramos"]), width="stretch", hide_index=True)
 
 if opcion == "Presentación":
     st.header("Plataforma ciudadana - Observatorio de indicadores")
@@ -17,7 +58,10 @@ if opcion == "Presentación":
     - Las propuestas se guardan en `data/propuestas_candidatos.csv`.
     """)
     st.markdown("**Cómo usar:** selecciona 'Indicadores' para ver series oficiales o 'Comparador de propuestas' para contrastar declaraciones de candidatos con la evidencia.")
-elif opcion == "Indicadores":
-    indicadores.mostrar_indicadores()
 else:
-    comparador.mostrar_comparador()
+    mostrar = cargar_pagina(opcion)
+    with telemetria.span("page.render", pagina=opcion):
+        mostrar()
+
+if telemetria.enabled() and st.session_state.get("perf_panel"):
+    mostrar_panel_rendimiento()
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# benchmarks offline del pipeline de datos (ver benchmarks/run.py)
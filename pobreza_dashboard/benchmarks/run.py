@@ -0,0 +1,354 @@
+# benchmarks/run.py
+"""
+Benchmarks offline del pipeline de datos y del comparador.
+
+Todo corre en local: los ZIP del World Bank son sintéticos y se sirven desde
+un servidor HTTP en 127.0.0.1 (benchmarks/wb_stub.py); los paneles ENAHO y
+las propuestas también se generan en memoria.
+
+Uso (desde pobreza_dashboard/):
+    python -m benchmarks.run                  # tamaños por defecto, compara con baseline.json
+    python -m benchmarks.run --full           # añade paneles ENAHO de 10M filas
+    python -m benchmarks.run --only enaho     # solo los casos cuyo nombre contiene 'enaho'
+    python -m benchmarks.run --save-baseline  # guarda los resultados como nueva referencia
+
+Sale con código 1 si algún caso es más lento (o usa más memoria) que la
+referencia por encima de --tolerance, o si la portada de la app supera su
+presupuesto de arranque (--landing-budget) o importa módulos de las páginas.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+import requests
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraping_ipe  # noqa: E402
+from modules import utils, metas  # noqa: E402
+from modules.validacion import validar_panel  # noqa: E402
+from modules.cubo import PovertyCube  # noqa: E402
+from modules.proyeccion import MotorEscenarios  # noqa: E402
+from modules import graficos  # noqa: E402
+from modules.propuestas import ProposalStore  # noqa: E402
+from benchmarks.wb_stub import WBStub  # noqa: E402
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+LANDING_BUDGET_S = 0.5
+# La portada no debe cargar nada de esto: lo importan solo las páginas al seleccionarlas
+LANDING_PROHIBIDOS = ["modules.indicadores", "modules.comparador", "scraping_ipe",
+                      "requests", "pandas", "plotly.express"]
+_LANDING_SCRIPT = """
+import sys, json, time, runpy, logging
+logging.disable(logging.WARNING)
+t0 = time.perf_counter()
+runpy.run_path("app.py")
+print(json.dumps({"seconds": time.perf_counter() - t0, "modules": sorted(sys.modules)}))
+"""
+ENAHO_SIZES = [1_000, 100_000, 1_000_000]
+ENAHO_SIZES_FULL = ENAHO_SIZES + [10_000_000]
+PROPOSAL_SIZES = [1_000, 10_000, 100_000]
+PROYECCION_GRID = [(100, 2_000), (1_000, 10_000)]   # (metas, escenarios)
+CHART_YEARS = [20, 1_000, 40_000]   # años por región (25 regiones)
+REGIONES = ["Amazonas", "Áncash", "Apurímac", "Arequipa", "Ayacucho", "Cajamarca", "Callao", "Cusco",
+            "Huancavelica", "Huánuco", "Ica", "Junín", "La Libertad", "Lambayeque", "Lima", "Loreto",
+            "Madre de Dios", "Moquegua", "Pasco", "Piura", "Puno", "San Martín", "Tacna", "Tumbes", "Ucayali"]
+FRASES = [
+    "Reducir la pobreza en {n}% en {h} años",
+    "Reducir a {n}% la pobreza extrema al {y}",
+    "Bajar la pobreza en {n} puntos en {h} años mediante transferencias",
+    "Reducir la pobreza a la mitad",
+    "Erradicar la pobreza extrema con programas focalizados",
+    "Ampliar programas de empleo local y apoyo a microempresas",
+    "Reducir la anemia infantil y mejorar la nutrición",
+]
+
+# nombre -> (segundos, pico MB, elementos procesados, unidad)
+Result = Tuple[float, float, int, str]
+
+
+def make_enaho_panel(n: int, seed: int = 0) -> pd.DataFrame:
+    """Panel con cabeceras como las de los Excel ENAHO (para ejercitar match_columns)."""
+    rng = np.random.default_rng(seed)
+    pov = rng.uniform(1e3, 1e6, n)
+    return pd.DataFrame({
+        "Departamento": rng.choice(REGIONES, n),
+        "Año": rng.integers(2004, 2025, n),
+        "No pobres no vulnerables": rng.uniform(1e3, 1e6, n),
+        "No pobres vulnerables": rng.uniform(1e3, 1e6, n),
+        "Pobres": pov,
+        "Pobreza extrema": pov * rng.uniform(0, 0.4, n),
+    })
+
+
+def make_proposals(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    texts = [FRASES[i % len(FRASES)].format(n=rng.integers(5, 60), h=rng.integers(2, 10), y=rng.integers(2026, 2036))
+             + f" (propuesta {i})" for i in range(n)]
+    return pd.DataFrame({
+        "candidato": [f"Candidato {i % 500}" for i in range(n)],
+        "partido": [f"Partido {i % 40}" for i in range(n)],
+        "tema": rng.choice(["Pobreza", "Empleo", "Salud"], n),
+        "propuesta": texts,
+        "fuente": "Programa oficial",
+        "fecha": "2025-09-20",
+    })
+
+
+def measure(fn: Callable[[], int], repeat: int) -> Tuple[float, float, int]:
+    """Mejor tiempo de 'repeat' ejecuciones y pico de memoria (tracemalloc) de una más."""
+    best = float("inf")
+    items = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1e6, items
+
+
+def bench_world_bank(add: Callable, repeat: int) -> None:
+    codes = ["SI.POV.DDAY", "SP.POP.TOTL"]
+    tmp = tempfile.mkdtemp(prefix="bench_wb_")
+    try:
+        with WBStub() as stub:
+            session = scraping_ipe.build_session()
+            url = scraping_ipe._indicator_url(codes[0], stub.base_url)
+            content = session.get(url, timeout=30).content
+
+            def download():
+                return len(requests.get(url, timeout=30).content)
+
+            def parse_all():
+                return len(scraping_ipe._parse_wb_zip(content))
+
+            def parse_peers():
+                return len(scraping_ipe._parse_wb_zip(content, list(scraping_ipe.PAISES_PARES)))
+
+            long = scraping_ipe._parse_wb_zip(content)
+            store = scraping_ipe.IndicatorStore(root=os.path.join(tmp, "warm"), base_url=stub.base_url, session=session)
+            store.write(codes[0], long)
+
+            def write():
+                store.write(codes[0], long)
+                return len(long)
+
+            def read_store():
+                return len(store.read(codes[0], ["PER"]))
+
+            def cold():
+                root = tempfile.mkdtemp(dir=tmp)
+                cold_store = scraping_ipe.IndicatorStore(root=root, base_url=stub.base_url, session=session)
+                return len(scraping_ipe.descargar_datos_pobreza_peru(store=cold_store))
+
+            warm_store = scraping_ipe.IndicatorStore(root=os.path.join(tmp, "e2e"), base_url=stub.base_url, session=session)
+            scraping_ipe.descargar_datos_pobreza_peru(store=warm_store)
+
+            def warm():
+                return len(scraping_ipe.descargar_datos_pobreza_peru(store=warm_store))
+
+            add("wb.http_download", download, "bytes")
+            add("wb.parse_zip_all", parse_all, "filas")
+            add("wb.parse_zip_peers", parse_peers, "filas")
+            add("wb.store_write", write, "filas")
+            add("wb.store_read_country", read_store, "filas")
+            add("wb.descargar_cold", cold, "filas")
+            add("wb.descargar_warm_304", warm, "filas")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_enaho(add: Callable, sizes: List[int]) -> None:
+    for n in sizes:
+        raw = make_enaho_panel(n)
+        matched = utils.match_columns(raw)
+        add(f"enaho.match_columns[{n}]", lambda: len(utils.match_columns(raw)), "filas")
+        add(f"enaho.validate_dataframe[{n}]", lambda: (utils.validate_dataframe(matched), len(matched))[1], "filas")
+        add(f"enaho.validar_panel[{n}]", lambda: (validar_panel(raw), len(raw))[1], "filas")
+        add(f"enaho.peru_total[{n}]", lambda: (utils.peru_total(matched), len(matched))[1], "filas")
+        add(f"enaho.cubo_build[{n}]", lambda: (PovertyCube.from_panel(matched), len(matched))[1], "filas")
+        del raw, matched
+
+
+def bench_metas(add: Callable, sizes: List[int]) -> None:
+    for n in sizes:
+        props = make_proposals(n)
+
+        def cold():
+            metas._MEMO.clear()
+            return len(metas.extraer_metas(props))
+
+        def memo():
+            return len(metas.extraer_metas(props))
+
+        add(f"metas.extraer_cold[{n}]", cold, "propuestas")
+        metas.extraer_metas(props)
+        add(f"metas.extraer_memo[{n}]", memo, "propuestas")
+
+
+def landing_startup(repeat: int) -> Tuple[float, List[str]]:
+    """
+    Arranque en frío de la portada: ejecuta app.py (en modo 'bare' de Streamlit,
+    opción por defecto "Presentación") en un intérprete nuevo, incluida la
+    importación de streamlit. Devuelve el mejor tiempo y los módulos prohibidos cargados.
+    """
+    best = float("inf")
+    loaded: List[str] = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _LANDING_SCRIPT], cwd=APP_DIR,
+                             capture_output=True, text=True, check=True).stdout
+        data = json.loads(out.strip().splitlines()[-1])
+        best = min(best, data["seconds"])
+        loaded = [m for m in LANDING_PROHIBIDOS if m in data["modules"]]
+    return best, loaded
+
+
+def bench_propuestas(add: Callable, sizes: List[int]) -> None:
+    tmp = tempfile.mkdtemp(prefix="bench_prop_")
+    try:
+        for n in sizes:
+            data = make_proposals(n).to_csv(index=False).encode("utf-8")
+
+            def ingest():
+                store = ProposalStore(os.path.join(tmp, f"ingest_{time.perf_counter_ns()}.sqlite"))
+                return store.ingest_bytes(data, "bench.csv")["nuevas"]
+
+            store = ProposalStore(os.path.join(tmp, f"query_{n}.sqlite"))
+            store.ingest_bytes(data, "bench.csv")
+            add(f"propuestas.ingest[{n}]", ingest, "propuestas")
+            add(f"propuestas.consulta_candidato[{n}]", lambda: len(store.consultar(candidato="Candidato 7")), "filas")
+            add(f"propuestas.consulta_con_meta[{n}]", lambda: len(store.consultar(con_meta=True, partido="Partido 3")),
+                "filas")
+            add(f"propuestas.valores_partido[{n}]", lambda: len(store.valores("partido")), "valores")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_proyeccion(add: Callable, grid: List[Tuple[int, int]]) -> None:
+    years = np.arange(1990, 2024)
+    poblacion = pd.Series(22e6 * np.exp(0.012 * (years - 1990)), index=years)
+    pobreza = pd.Series(np.linspace(15, 3, len(years)), index=years)
+    rng = np.random.default_rng(0)
+    for n_metas, n_esc in grid:
+        metas_pct = rng.uniform(0, 3, n_metas)
+        horizontes = rng.integers(1, 15, n_metas)
+        motor = MotorEscenarios(poblacion, pobreza, n=n_esc)
+        add(f"proyeccion.motor[{n_esc}]", lambda: (MotorEscenarios(poblacion, pobreza, n=n_esc), n_esc)[1], "escenarios")
+        add(f"proyeccion.resumen[{n_metas}x{n_esc}]",
+            lambda: len(motor.resumen(3.0, 34e6, metas_pct, horizontes, 2023)) * n_esc, "celdas")
+
+
+def bench_graficos(add: Callable, sizes: List[int]) -> None:
+    rng = np.random.default_rng(0)
+    for years in sizes:
+        df = pd.DataFrame({
+            "region": np.repeat(REGIONES, years),
+            "year": np.tile(np.arange(years), len(REGIONES)),
+            "pov_pct": rng.uniform(0, 60, len(REGIONES) * years),
+        })
+        n = len(df)
+
+        def cold():
+            graficos._figuras.clear()
+            fig = graficos.lineas(df, "year", "pov_pct", "region", clave=("bench", years))
+            return len(fig.to_json()) and n
+
+        add(f"graficos.lineas_cold[{n}]", cold, "puntos")
+        add(f"graficos.lineas_memo[{n}]",
+            lambda: (graficos.lineas(df, "year", "pov_pct", "region", clave=("bench", years)), n)[1], "puntos")
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Casos más lentos o con más memoria que la referencia (con un margen de ruido)."""
+    regressions = []
+    for name, (secs, peak, _, _) in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        if secs > ref["seconds"] * (1 + tolerance) and secs - ref["seconds"] > 0.005:
+            regressions.append(f"{name}: {secs * 1e3:.1f} ms vs {ref['seconds'] * 1e3:.1f} ms de referencia")
+        if peak > ref["peak_mb"] * (1 + tolerance) and peak - ref["peak_mb"] > 1.0:
+            regressions.append(f"{name}: pico {peak:.1f} MB vs {ref['peak_mb']:.1f} MB de referencia")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks offline del observatorio de pobreza.")
+    parser.add_argument("--full", action="store_true", help="incluir paneles ENAHO de 10M filas")
+    parser.add_argument("--only", default="", help="filtrar casos por subcadena del nombre")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por caso (se toma la mejor)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="archivo JSON de referencia")
+    parser.add_argument("--save-baseline", action="store_true", help="guardar resultados como referencia")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="margen relativo antes de marcar regresión")
+    parser.add_argument("--landing-budget", type=float, default=LANDING_BUDGET_S,
+                        help="segundos máximos de arranque en frío de la portada")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Result] = {}
+    budget_errors: List[str] = []
+
+    def add(name: str, fn: Callable[[], int], unit: str) -> None:
+        if args.only and args.only not in name:
+            return
+        secs, peak, items = measure(fn, args.repeat)
+        results[name] = (secs, peak, items, unit)
+        rate = items / secs if secs > 0 else float("inf")
+        print(f"{name:<36} {secs * 1e3:>10.2f} ms {rate:>14,.0f} {unit}/s {peak:>9.1f} MB", flush=True)
+
+    print(f"{'caso':<36} {'tiempo':>13} {'throughput':>22} {'pico':>12}")
+    if not args.only or args.only in "app.landing_startup":
+        secs, loaded = landing_startup(args.repeat)
+        results["app.landing_startup"] = (secs, 0.0, 1, "arranques")
+        print(f"{'app.landing_startup':<36} {secs * 1e3:>10.2f} ms {'presupuesto':>14} {args.landing_budget * 1e3:.0f} ms",
+              flush=True)
+        if secs > args.landing_budget:
+            budget_errors.append(f"app.landing_startup: {secs * 1e3:.0f} ms > presupuesto de "
+                                 f"{args.landing_budget * 1e3:.0f} ms")
+        if loaded:
+            budget_errors.append("app.landing_startup: la portada importa " + ", ".join(loaded))
+    bench_world_bank(add, args.repeat)
+    bench_enaho(add, ENAHO_SIZES_FULL if args.full else ENAHO_SIZES)
+    bench_metas(add, PROPOSAL_SIZES)
+    bench_propuestas(add, PROPOSAL_SIZES)
+    bench_proyeccion(add, PROYECCION_GRID)
+    bench_graficos(add, CHART_YEARS)
+
+    if args.save_baseline:
+        data = {name: {"seconds": s, "peak_mb": p, "items": i, "unit": u} for name, (s, p, i, u) in results.items()}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        print(f"\nReferencia guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nSin referencia en {args.baseline}; usa --save-baseline para crearla.")
+        baseline = {}
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = budget_errors + compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegresiones:")
+        for r in regressions:
+            print("  -", r)
+        return 1
+    print("\nSin regresiones respecto a la referencia.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
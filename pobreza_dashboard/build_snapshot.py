@@ -0,0 +1,115 @@
+# build_snapshot.py
+"""
+Construye la instantánea offline que la app mapea en memoria al arrancar.
+
+Descarga (o revalida contra el almacén local) todos los indicadores de
+INDICADORES_WB para todos los países, deriva la serie de Perú con conteos y el
+panel de países pares, normaliza las propuestas y, opcionalmente, precalcula el
+cubo regional desde paneles ENAHO. Cada conjunto se guarda como tabla Arrow IPC
+en una nueva versión de data/snapshot/ (ver modules/snapshot.py).
+
+Uso (desde pobreza_dashboard/):
+    python build_snapshot.py
+    python build_snapshot.py --enaho panel_2004_2024.xlsx otro.csv
+    python build_snapshot.py --out /srv/pobreza/snapshot
+"""
+import os
+import sys
+import argparse
+import logging
+import pandas as pd
+from typing import List, Optional
+
+import scraping_ipe
+from modules import snapshot
+from modules.cubo import PovertyCube
+from modules.enaho import cargar_panel_enaho, content_hash
+from modules.utils import normalize_proposals, read_proposals_csv
+
+PROPUES_CSV = "data/propuestas_candidatos.csv"
+
+logger = logging.getLogger("pobreza.snapshot")
+
+
+def indicadores_wb(store: scraping_ipe.IndicatorStore) -> pd.DataFrame:
+    """Todos los indicadores de INDICADORES_WB, todos los países, en formato largo."""
+    frames = []
+    for code in scraping_ipe.INDICADORES_WB:
+        long = store.get(code)
+        frames.append(long.assign(indicator=code))
+        logger.info("%s: %d filas", code, len(long))
+    df = pd.concat(frames, ignore_index=True)
+    df["country_code"] = df["country_code"].astype(str)
+    return df[["country_code", "indicator", "year", "value"]].sort_values(
+        ["country_code", "indicator", "year"]).reset_index(drop=True)
+
+
+def panel_pares(long: pd.DataFrame, indicator_code: str = "SI.POV.DDAY") -> pd.DataFrame:
+    """Mismo formato que scraping_ipe.descargar_panel_pares."""
+    df = long[(long["indicator"] == indicator_code) & long["country_code"].isin(list(scraping_ipe.PAISES_PARES))]
+    df = df[["country_code", "year", "value"]].copy()
+    df["country"] = df["country_code"].map(scraping_ipe.PAISES_PARES)
+    return df[["country_code", "country", "year", "value"]].reset_index(drop=True)
+
+
+def propuestas(path: str) -> pd.DataFrame:
+    df = normalize_proposals(read_proposals_csv(path))
+    # Texto en todas las columnas: Arrow exige un tipo por columna
+    return df.fillna("").astype(str)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Construye la instantánea offline del observatorio.")
+    parser.add_argument("--out", default=snapshot.SNAPSHOT_DIR, help="directorio de instantáneas")
+    parser.add_argument("--propuestas", default=PROPUES_CSV, help="CSV de propuestas")
+    parser.add_argument("--enaho", nargs="*", default=[], help="paneles ENAHO (Excel/CSV) para el cubo regional")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    store = scraping_ipe.get_store()
+    try:
+        long = indicadores_wb(store)
+    except Exception as e:
+        logger.error("No se pudieron obtener los indicadores del Banco Mundial: %s", e)
+        return 1
+
+    tablas = {
+        "wb_indicadores": long,
+        "serie_peru": scraping_ipe.serie_pobreza(long, "PER", compute_counts=True),
+        "pares": panel_pares(long),
+    }
+    fuentes = {}
+    if os.path.exists(args.propuestas):
+        tablas["propuestas"] = propuestas(args.propuestas)
+        fuentes["propuestas"] = args.propuestas
+    else:
+        logger.warning("Sin CSV de propuestas en %s: la instantánea no las incluye.", args.propuestas)
+
+    sources = []
+    if args.enaho:
+        cubo = PovertyCube()
+        for path in args.enaho:
+            with open(path, "rb") as f:
+                data = f.read()
+            df, msgs, _ = cargar_panel_enaho(data, os.path.basename(path))
+            for m in msgs:
+                logger.warning("%s: %s", path, m)
+            if df.empty:
+                logger.error("%s no tiene las columnas obligatorias; se omite.", path)
+                continue
+            source = content_hash(data)
+            cubo.append(df, source=source)
+            sources.append(source)
+        if not cubo.empty:
+            tablas["cubo_celdas"] = cubo.to_frame()
+            tablas["cubo_nacional"] = cubo.national_counts()
+
+    final = snapshot.escribir_snapshot(tablas, args.out, fuentes=fuentes, extra={"enaho_fuentes": sources})
+    for name, df in tablas.items():
+        logger.info("  %-16s %8d filas", name, len(df))
+    logger.info("Instantánea activa: %s", final)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# conftest.py
+# En la raíz de la app: pytest agrega este directorio a sys.path (modules, scraping_ipe, benchmarks)
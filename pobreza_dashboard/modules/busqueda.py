@@ -0,0 +1,140 @@
+# modules/busqueda.py
+import re
+import math
+import bisect
+import heapq
+import threading
+from collections import Counter, defaultdict
+import pandas as pd
+from typing import Dict, List, Optional
+from modules.utils import normalize_str
+
+# Campos indexados y su peso en el ranking
+SEARCH_FIELDS = {"candidato": 3.0, "partido": 2.0, "tema": 2.0, "propuesta": 1.0}
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los", "o", "para",
+    "por", "que", "se", "su", "sus", "un", "una", "y",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text) -> List[str]:
+    """Tokens sin tildes ni mayúsculas (mismo plegado que utils.normalize_str)."""
+    return [t for t in _TOKEN_RE.findall(normalize_str(text)) if t not in STOPWORDS]
+
+
+class ProposalIndex:
+    """
+    Índice invertido sobre las propuestas (candidato, partido, tema, propuesta).
+
+    Cada documento es una fila, identificada por su etiqueta en el DataFrame (el id
+    de ProposalStore, que ya deduplica por contenido). Se construye de forma
+    incremental: add() indexa solo las etiquetas nuevas, y 'ultimo_id' recuerda
+    hasta qué id del almacén se ha indexado, así cada búsqueda solo agrega las
+    filas ingresadas desde la anterior. search() puntúa con TF-IDF ponderado por campo y
+    acepta el último término como prefijo, para búsquedas mientras se escribe.
+    """
+
+    def __init__(self, fields: Optional[Dict[str, float]] = None):
+        self.fields = fields or SEARCH_FIELDS
+        self._postings: Dict[str, Dict[object, float]] = defaultdict(dict)
+        self._doc_tokens: Dict[object, List[str]] = {}
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+        self._frame = pd.DataFrame()
+        self._ultimo_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    @property
+    def ultimo_id(self) -> int:
+        """Último id del almacén ya indexado."""
+        with self._lock:
+            return self._ultimo_id
+
+    def add(self, df: pd.DataFrame, hasta_id: Optional[int] = None) -> int:
+        """
+        Agrega filas nuevas sin retirar las ya indexadas (ingesta incremental, p. ej.
+        las filas de ProposalStore con id mayor a ultimo_id). 'hasta_id' es el id del
+        almacén cubierto por 'df'. Devuelve cuántas filas se indexaron.
+        """
+        with self._lock:
+            if hasta_id is not None:
+                # Dos sesiones pueden agregar a la vez: nunca retroceder
+                self._ultimo_id = max(self._ultimo_id, int(hasta_id))
+            if df.empty:
+                return 0
+            fresh = df[~df.index.duplicated() & ~df.index.isin(list(self._doc_tokens))]
+            self._index_rows(fresh)
+            self._frame = fresh if self._frame.empty else pd.concat([self._frame, fresh])
+            return len(fresh)
+
+    def retain(self, labels) -> int:
+        """Retira las filas cuya etiqueta no está en 'labels' (borradas del almacén). Devuelve cuántas."""
+        keep = set(labels)
+        with self._lock:
+            gone = [k for k in self._doc_tokens if k not in keep]
+            for key in gone:
+                for tok in self._doc_tokens.pop(key):
+                    posting = self._postings[tok]
+                    posting.pop(key, None)
+                    if not posting:
+                        del self._postings[tok]
+                        self._vocab_dirty = True
+            if gone:
+                self._frame = self._frame.drop(index=gone)
+            return len(gone)
+
+    def _index_rows(self, df: pd.DataFrame) -> None:
+        """Indexa las filas de 'df' por su etiqueta. Llamar con el lock tomado."""
+        fields = [(f, w) for f, w in self.fields.items() if f in df.columns]
+        rows = df[[f for f, _ in fields]]
+        for key, values in zip(df.index, rows.itertuples(index=False, name=None)):
+            weights: Counter = Counter()
+            for (_, w), value in zip(fields, values):
+                for tok in tokenize(value):
+                    weights[tok] += w
+            self._doc_tokens[key] = list(weights)
+            for tok, w in weights.items():
+                if tok not in self._postings:
+                    self._vocab_dirty = True
+                self._postings[tok][key] = w
+
+    def _expand(self, token: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [token] if token in self._postings else []
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        lo = bisect.bisect_left(self._vocab, token)
+        hi = bisect.bisect_left(self._vocab, token + "\uffff")
+        return self._vocab[lo:hi]
+
+    def search(self, query: str, limit: int = 50) -> pd.DataFrame:
+        """Filas que contienen todos los términos de la búsqueda, ordenadas por relevancia."""
+        tokens = tokenize(query)
+        if not tokens:
+            return self._frame.iloc[0:0].assign(score=pd.Series(dtype=float))
+        with self._lock:
+            n_docs = max(len(self._doc_tokens), 1)
+            scores: Optional[Dict[object, float]] = None
+            for i, tok in enumerate(tokens):
+                matches: Dict[object, float] = defaultdict(float)
+                for term in self._expand(tok, prefix=(i == len(tokens) - 1)):
+                    posting = self._postings[term]
+                    idf = math.log(1 + n_docs / len(posting))
+                    for key, w in posting.items():
+                        matches[key] += w * idf
+                if scores is None:
+                    scores = dict(matches)
+                else:
+                    scores = {k: s + matches[k] for k, s in scores.items() if k in matches}
+                if not scores:
+                    break
+            best = heapq.nlargest(limit, (scores or {}).items(), key=lambda kv: kv[1])
+            labels = [k for k, _ in best]
+            out = self._frame.loc[labels].copy()
+        out["score"] = [round(s, 3) for _, s in best]
+        return out
@@ -1,53 +1,102 @@
 # modules/comparador.py
 import os
-import io
+import logging
 import pandas as pd
-import re
 import streamlit as st
-import plotly.express as px
+import plotly.graph_objects as go
 from modules.utils import match_columns, validate_dataframe, peru_total, fmt_int
-from scraping_ipe import descargar_datos_pobreza_peru
+from modules.metas import nivel_objetivo, ambicion
+from modules.panel import IndicatorPanel, panel_oficial, PAIS_DEFAULT
+from modules.busqueda import ProposalIndex, SEARCH_FIELDS
+from modules.propuestas import ProposalStore
+from modules.proyeccion import MotorEscenarios, N_ESCENARIOS
+from modules.snapshot import snapshot_actual
+from modules import telemetria, graficos
+from modules.compartido import cache, vista
 
 PROPUES_CSV = "data/propuestas_candidatos.csv"
 CACHE_TTL = 60 * 60 * 6
+MAX_FILAS_TABLA = 500
+TODOS = "Todos"
 
-@st.cache_data(ttl=CACHE_TTL)
-def _load_proposals_from_disk():
-    """Intentar cargar CSV de propuestas desde disco (repo)."""
-    if not os.path.exists(PROPUES_CSV):
-        return pd.DataFrame()
+logger = logging.getLogger("pobreza.comparador")
+
+@st.cache_resource(show_spinner=False)
+def _get_store() -> ProposalStore:
+    """Almacén SQLite de propuestas, compartido entre sesiones."""
+    return ProposalStore()
+
+def _sync_repo(store: ProposalStore) -> dict:
+    """
+    Ingiere el CSV del repo (o, si no existe, las propuestas de la instantánea), que
+    es la fuente de verdad de sus filas: una versión nueva reemplaza a la anterior.
+    Un archivo ya ingerido solo cuesta su sha256. Solo la primera vez es síncrona:
+    después se revisa en segundo plano antes de cada CACHE_TTL.
+    """
+    return cache.get(("proposals_repo", store.path), lambda: _ingest_repo(store), ttl=CACHE_TTL,
+                     refrescar=True, aceptar=bool)
+
+def _ingest_repo(store: ProposalStore) -> dict:
+    """Resumen de la ingesta; {} si no hay fuente o si falla (CSV mal formado)."""
     try:
-        # Intentar UTF-8, fallback a latin1
-        try:
-            df = pd.read_csv(PROPUES_CSV)
-        except Exception:
-            df = pd.read_csv(PROPUES_CSV, encoding="latin1")
-        return df
-    except Exception:
-        return pd.DataFrame()
-
-def _normalize_proposals(df: pd.DataFrame) -> pd.DataFrame:
-    # asegurar columnas mínimas con nombres lowercase
-    df = df.rename(columns={c: c.strip() for c in df.columns})
-    lowercase = {c: c.lower() for c in df.columns}
-    df = df.rename(columns=lowercase)
-    expected = ["candidato","partido","tema","propuesta","fuente","fecha"]
-    for e in expected:
-        if e not in df.columns:
-            df[e] = ""
-    return df
+        if os.path.exists(PROPUES_CSV):
+            return store.ingest_csv(PROPUES_CSV, reemplazar=True)
+        snap = snapshot_actual()
+        if snap is not None and snap.has("propuestas"):
+            # La instantánea guarda el mismo CSV del repo: mismo origen
+            return store.ingest_frame(snap.frame("propuestas"), f"snapshot:{snap.version}",
+                                      snap.manifest["tablas"]["propuestas"]["sha256"],
+                                      reemplazar=True, origen=PROPUES_CSV)
+        # Sin CSV ni instantánea: el repo ya no aporta propuestas
+        return {"archivo": PROPUES_CSV, "retiradas": store.retirar(PROPUES_CSV)}
+    except Exception as e:
+        logger.warning("No se pudieron ingerir las propuestas del repo: %s", e)
+    return {}
+
+@st.cache_resource
+def _shared_proposal_index() -> ProposalIndex:
+    """Índice de búsqueda sobre el almacén, compartido entre sesiones (se amplía por id)."""
+    return ProposalIndex()
+
+def _consulta(store: ProposalStore, **filtros) -> pd.DataFrame:
+    """
+    Consulta al almacén compartida entre sesiones: misma versión y filtros, una
+    vista sin copia del DataFrame (solo lectura) de la caché del proceso.
+    """
+    key = ("propuestas", store.path, store.revision, tuple(sorted(filtros.items())))
+    return vista(cache.get(key, lambda: store.consultar(**filtros), nombre="propuestas"))
+
+def _buscar(store: ProposalStore, query: str) -> pd.DataFrame:
+    """Resultados de la búsqueda (filas completas del almacén, con score, por relevancia)."""
+    index = _shared_proposal_index()
+    version = store.version
+    desde = index.ultimo_id
+    if version > desde:
+        # Solo las filas ingresadas desde la última búsqueda
+        nuevas = store.consultar(columns=list(SEARCH_FIELDS), desde_id=desde)
+        with telemetria.span("comparador.index_update", rows=len(nuevas)):
+            index.add(nuevas, hasta_id=version)
+    if len(index) != len(store):
+        # Filas retiradas del almacén (nueva versión del CSV del repo)
+        with telemetria.span("comparador.index_prune"):
+            index.retain(store.ids())
+    with telemetria.span("comparador.search"):
+        hits = index.search(query)
+    rows = store.consultar(ids=hits.index)
+    hits = hits[hits.index.isin(rows.index)]   # retiradas entre la búsqueda y la consulta
+    return rows.loc[hits.index].assign(score=hits["score"])
+
+def _motor_escenarios(pop_hist: tuple, pov_hist: tuple, n: int) -> MotorEscenarios:
+    """Escenarios simulados una vez por historia (serie oficial o subida) y tamaño."""
+    return cache.get(("motor_escenarios", pop_hist, pov_hist, n), lambda: MotorEscenarios(
+        pd.Series(dict(pop_hist), dtype=float), pd.Series(dict(pov_hist), dtype=float), n=n))
 
 def mostrar_comparador():
     st.header("Comparador de propuestas")
 
-    # 1) cargar propuestas desde disco (si existe)
-    proposals = _load_proposals_from_disk()
-    if proposals.empty:
-        st.warning("No hay propuestas cargadas en 'data/propuestas_candidatos.csv'. Puedes subir un CSV temporalmente aquí o descargar una plantilla.")
-    else:
-        proposals = _normalize_proposals(proposals)
-        st.subheader("Propuestas cargadas (desde repo)")
-        st.dataframe(proposals, width="stretch")
+    # 1) propuestas del almacén (el CSV del repo se ingiere si cambió)
+    store = _get_store()
+    _sync_repo(store)
 
     # Ofrecer plantilla de ejemplo para descargar
     if st.button("Descargar plantilla de propuestas (CSV)"):
@@ -62,34 +111,60 @@ def mostrar_comparador():
         csv_bytes = sample.to_csv(index=False).encode("utf-8")
         st.download_button("Descargar CSV plantilla", data=csv_bytes, file_name="propuestas_plantilla.csv", mime="text/csv")
 
-    # 2) permitir subida temporal por UI (por si no quieres commitear el CSV)
-    uploaded = st.file_uploader("O sube un CSV de propuestas (temporal)", type=["csv"], key="proposals_upl")
+    # 2) subidas por UI: se agregan al almacén (sin duplicar filas ya existentes)
+    uploaded = st.file_uploader("Agregar propuestas desde un CSV", type=["csv"], key="proposals_upl")
     if uploaded:
         try:
-            try:
-                df_uploaded = pd.read_csv(uploaded)
-            except Exception:
-                uploaded.seek(0)
-                df_uploaded = pd.read_csv(io.TextIOWrapper(uploaded, encoding="latin1"))
-            proposals = _normalize_proposals(df_uploaded)
-            st.success("Archivo de propuestas cargado desde la UI.")
-            st.dataframe(proposals, width="stretch")
+            res = store.ingest_bytes(uploaded.getvalue(), uploaded.name)
+            if res["repetido"]:
+                st.info(f"'{uploaded.name}' ya se había agregado.")
+            else:
+                st.success(f"'{uploaded.name}' ({res['encoding']}): {res['nuevas']} propuesta(s) nuevas, "
+                           f"{res['duplicadas']} ya existentes.")
         except Exception as e:
             st.error("No se pudo leer el CSV subido.")
             st.exception(e)
             return
 
     # 3) Mostrar tabla si sigue vacía
-    if proposals.empty:
-        st.info("Sigue sin propuestas disponibles. Sube un CSV o añade 'data/propuestas_candidatos.csv' al repo.")
+    total = len(store)
+    if total == 0:
+        st.warning("No hay propuestas cargadas. Sube un CSV o añade 'data/propuestas_candidatos.csv' al repo.")
     else:
+        # Filtros resueltos con los índices del almacén: solo se leen las filas de la vista
+        f1, f2 = st.columns(2)
+        partido = f1.selectbox("Partido", [TODOS] + store.valores("partido"), key="proposals_partido")
+        tema = f2.selectbox("Tema", [TODOS] + store.valores("tema"), key="proposals_tema")
+        filtros = {"partido": None if partido == TODOS else partido, "tema": None if tema == TODOS else tema}
+        n_vista = store.contar(**filtros)
+        st.subheader("Propuestas cargadas")
+        st.dataframe(_consulta(store, limit=MAX_FILAS_TABLA, **filtros).drop(columns=["meta_tipo", "menciona_reduccion"]),
+                     width="stretch")
+        st.caption(f"{fmt_int(n_vista)} de {fmt_int(total)} propuesta(s)"
+                   + (f"; se muestran las primeras {MAX_FILAS_TABLA}." if n_vista > MAX_FILAS_TABLA else "."))
+
+        # Búsqueda sin tildes sobre candidato, partido, tema y propuesta
+        query = st.text_input("Buscar propuestas (candidato, partido, tema o texto)", key="proposals_query")
+        matches = None
+        if query.strip():
+            matches = _buscar(store, query)
+            for col, val in filtros.items():
+                if val is not None:
+                    matches = matches[matches[col] == val]
+        if matches is not None:
+            if matches.empty:
+                st.info("Ninguna propuesta coincide con la búsqueda.")
+            else:
+                st.caption(f"{len(matches)} propuesta(s) encontradas.")
+                st.dataframe(matches, width="stretch")
+
         # continuar con el flujo de comparación
         st.markdown("---")
         st.subheader("Comparación: Pobreza (serie oficial)")
 
         # Obtener serie oficial (World Bank) con fallback silencioso
-        df_wb = descargar_datos_pobreza_peru(compute_counts=True)
-        if df_wb is None or df_wb.empty:
+        panel = panel_oficial()
+        if panel.empty:
             st.error("No se pudo descargar la serie oficial para comparar. Sube un backup o revisa la conectividad.")
             # ofrecer uploader para una serie alternativa
             uploaded_series = st.file_uploader("Sube una serie alternativa (CSV/XLSX) con columnas year,pov_pct[,population]", type=["csv","xlsx","xls"], key="series_upl")
@@ -107,66 +182,117 @@ def mostrar_comparador():
             else:
                 return
 
-        # normalize df_wb columns
-        if "year" not in df_wb.columns and "Año" in df_wb.columns:
-            df_wb = df_wb.rename(columns={"Año":"year"})
-        if "pov_pct" not in df_wb.columns and "Pobreza (%)" in df_wb.columns:
-            df_wb = df_wb.rename(columns={"Pobreza (%)":"pov_pct"})
-        if "population" not in df_wb.columns and "Population" in df_wb.columns:
-            df_wb = df_wb.rename(columns={"Population":"population"})
-        # coerce
-        df_wb["year"] = pd.to_numeric(df_wb["year"], errors="coerce").astype("Int64")
+            panel = IndicatorPanel.from_series(df_wb)
 
         # selector de año (último disponible por defecto)
-        years = sorted(df_wb["year"].dropna().unique().tolist())
+        years = panel.years(PAIS_DEFAULT, "pov_pct")
         if not years:
             st.error("La serie oficial no contiene años válidos.")
             return
         year_sel = st.selectbox("Año de referencia para la comparación", years, index=len(years)-1)
 
-        wb_row = df_wb[df_wb["year"] == year_sel].iloc[0]
-        wb_pct = float(wb_row.get("pov_pct", float("nan")))
-        population = int(wb_row.get("population", 0)) if not pd.isna(wb_row.get("population", None)) else None
-        pov_count = int(wb_row.get("pov_count", 0)) if "pov_count" in wb_row and not pd.isna(wb_row.get("pov_count")) else None
+        wb_pct = panel.value(PAIS_DEFAULT, "pov_pct", year_sel)
+        population = panel.value(PAIS_DEFAULT, "population", year_sel)
+        population = int(population) if not pd.isna(population) else None
+        pov_count = panel.value(PAIS_DEFAULT, "pov_count", year_sel)
+        pov_count = int(pov_count) if not pd.isna(pov_count) else None
 
         st.markdown(f"**Situación oficial ({year_sel}):** {wb_pct:.2f}% de la población en pobreza." + (f" ≈ {fmt_int(pov_count)} personas." if pov_count else (" (no hay conteo calculado)" if not population else "")))
 
+        # Escenarios Monte Carlo (población SP.POP.TOTL y volatilidad de la pobreza hasta el año elegido)
+        motor = None
+        if population:
+            n_escenarios = st.select_slider("Escenarios Monte Carlo", [500, 1000, 2000, 5000, 10000],
+                                            value=N_ESCENARIOS, key="n_escenarios")
+            pop_hist = tuple(panel.slice(PAIS_DEFAULT, "population", end=year_sel).items())
+            pov_hist = tuple(panel.slice(PAIS_DEFAULT, "pov_pct", end=year_sel).items())
+            motor = _motor_escenarios(pop_hist, pov_hist, n_escenarios)
+
+        # Metas extraídas al ingerir: solo se leen las propuestas con meta
+        with telemetria.span("comparador.metas"):
+            con_meta = _consulta(store, con_meta=True, **filtros)
+        st.subheader("Ranking de propuestas por ambición")
+        if con_meta.empty:
+            st.info("Ninguna propuesta incluye una meta cuantitativa detectable.")
+        else:
+            ranking = con_meta.assign(
+                nivel_meta=nivel_objetivo(con_meta, wb_pct).round(2),
+                reduccion=ambicion(con_meta, wb_pct).round(1),
+            ).sort_values("reduccion", ascending=False)
+            cols = ["candidato", "partido", "propuesta", "meta_indicador", "nivel_meta", "reduccion", "meta_horizonte"]
+            if motor is not None:
+                # Toda la grilla metas × escenarios en una sola evaluación vectorizada
+                with telemetria.span("comparador.proyeccion", metas=len(ranking), escenarios=motor.n):
+                    proy = motor.resumen(wb_pct, population, ranking["nivel_meta"], ranking["meta_horizonte"],
+                                         year_sel, index=ranking.index)
+                ranking = ranking.assign(
+                    reduccion_anual_pp=proy["reduccion_anual_pp"].round(2),
+                    salen=proy["salen_p50"].round(-3).astype("Int64"),
+                    rango=[f"{fmt_int(a)} – {fmt_int(b)}" for a, b in zip(proy["salen_p10"], proy["salen_p90"])],
+                )
+                cols += ["reduccion_anual_pp", "salen", "rango"]
+            st.dataframe(ranking[cols].rename(columns={
+                "meta_indicador": "Indicador", "nivel_meta": "Meta (%)",
+                "reduccion": "Reducción implícita (%)", "meta_horizonte": "Horizonte (años)",
+                "reduccion_anual_pp": "Reducción anual (pp)", "salen": "Personas que salen (mediana)",
+                "rango": "Rango P10–P90",
+            }), width="stretch")
+            if motor is not None:
+                st.caption(f"Proyección con {fmt_int(motor.n)} escenarios de crecimiento poblacional y choques económicos "
+                           "estimados de la historia oficial; sin horizonte explícito se asumen 5 años.")
+
         # candidato selector
-        candidatos = proposals["candidato"].unique().tolist()
+        # si hay búsqueda con resultados, limitar candidatos a los encontrados
+        buscando = matches is not None and not matches.empty
+        candidatos = matches["candidato"].unique().tolist() if buscando else store.valores("candidato", **filtros)
         candidato_sel = st.selectbox("Selecciona un candidato", ["--Seleccionar--"] + candidatos)
 
         if candidato_sel != "--Seleccionar--":
-            prop = proposals[proposals["candidato"] == candidato_sel].iloc[0]
+            props_cand = (matches[matches["candidato"] == candidato_sel] if buscando
+                          else _consulta(store, candidato=candidato_sel, **filtros))
+            prop = props_cand.iloc[0]
+            if len(props_cand) > 1:
+                pos = st.selectbox("Propuesta", range(len(props_cand)),
+                                   format_func=lambda i: f"{props_cand.iloc[i].get('tema','-')}: {str(props_cand.iloc[i].get('propuesta',''))[:80]}")
+                prop = props_cand.iloc[pos]
             st.markdown(f"### Propuesta de **{candidato_sel}** ({prop.get('partido','')})")
             st.markdown(f"**Tema:** {prop.get('tema','-')}")
             st.markdown(f"**Propuesta:** {prop.get('propuesta','-')}")
             st.markdown(f"**Fuente:** {prop.get('fuente','-')}  |  **Fecha:** {prop.get('fecha','-')}")
 
-            p_text = str(prop.get("propuesta","")).lower()
-            # heurística simple para detectar meta cuantitativa
-            m = re.search(r"(\b\d{1,3}(?:\.\d+)?\s?%|\bmitad\b|\b50\b|\breducir\b)", p_text)
             target_pct = None
-            if m:
-                found = m.group(0)
-                if "%" in found:
-                    try:
-                        target_pct = float(found.replace("%","").strip())
-                    except:
-                        target_pct = None
-                elif "mitad" in found or "50" in found:
-                    target_pct = wb_pct * 0.5
-                elif "reducir" in found:
-                    # no sabemos cuánto reducir; pedir claridad
-                    st.info("La propuesta menciona reducir, pero no incluye una cifra clara (porcentaje).")
+            if pd.notna(prop["meta_valor"]):
+                target_pct = float(nivel_objetivo(props_cand.loc[[prop.name]], wb_pct).iloc[0])
+            elif prop["menciona_reduccion"]:
+                # no sabemos cuánto reducir; pedir claridad
+                st.info("La propuesta menciona reducir, pero no incluye una cifra clara (porcentaje).")
             else:
                 st.info("No se detectó una meta cuantitativa clara en la propuesta. Se requiere especificación para evaluar impacto directo.")
 
             if target_pct is not None:
-                st.success(f"Meta detectada: reducir pobreza a {target_pct:.2f}%")
-                fig = px.bar(x=["Oficial","Meta (candidato)"], y=[wb_pct, target_pct], labels={"y":"% pobreza"})
-                st.plotly_chart(fig, width="stretch")
-                if population:
-                    target_count = int((target_pct / 100.0) * population)
-                    st.info(f"Meta implicaría ≈ {fmt_int(target_count)} personas por salir de pobreza (si la población se mantiene).")
+                indicador = "pobreza extrema" if prop["meta_indicador"] == "pobreza_extrema" else "pobreza"
+                horizonte = f" en {int(prop['meta_horizonte'])} años" if pd.notna(prop["meta_horizonte"]) else ""
+                st.success(f"Meta detectada: reducir {indicador} a {target_pct:.2f}%{horizonte}")
+                with telemetria.span("comparador.plot.meta"):
+                    fig = graficos.barras(["Oficial", "Meta (candidato)"], [wb_pct, target_pct], labels={"y": "% pobreza"})
+                    st.plotly_chart(fig, width="stretch")
+                if motor is not None:
+                    proy = motor.resumen(wb_pct, population, [target_pct], [prop["meta_horizonte"]], year_sel).iloc[0]
+                    st.info(f"Meta implicaría ≈ {fmt_int(proy['salen_p50'])} personas fuera de la pobreza en "
+                            f"{int(proy['anio_meta'])} (rango {fmt_int(proy['salen_p10'])} – {fmt_int(proy['salen_p90'])}), "
+                            f"reduciendo {proy['reduccion_anual_pp']:.2f} puntos por año.")
+                    bandas = motor.bandas(wb_pct, population, target_pct, prop["meta_horizonte"], year_sel)
+                    with telemetria.span("comparador.plot.proyeccion", points=len(bandas)):
+                        fig_p = graficos.figura(("proyeccion", graficos.fingerprint(bandas)), lambda: go.Figure([
+                            go.Scatter(x=bandas["year"], y=bandas["sin_cambio_p90"], line=dict(width=0), showlegend=False, hoverinfo="skip"),
+                            go.Scatter(x=bandas["year"], y=bandas["sin_cambio_p10"], fill="tonexty", line=dict(width=0),
+                                       fillcolor="rgba(150,150,150,0.25)", name="Sin cambios (P10–P90)"),
+                            go.Scatter(x=bandas["year"], y=bandas["sin_cambio_p50"], line=dict(color="gray", dash="dash"), name="Sin cambios (mediana)"),
+                            go.Scatter(x=bandas["year"], y=bandas["pobres_p90"], line=dict(width=0), showlegend=False, hoverinfo="skip"),
+                            go.Scatter(x=bandas["year"], y=bandas["pobres_p10"], fill="tonexty", line=dict(width=0),
+                                       fillcolor="rgba(31,119,180,0.25)", name="Con la meta (P10–P90)"),
+                            go.Scatter(x=bandas["year"], y=bandas["pobres_p50"], line=dict(color="#1f77b4"), name="Con la meta (mediana)"),
+                        ], layout=dict(title="Personas en pobreza proyectadas", yaxis_title="Personas", xaxis_title="Año")))
+                        st.plotly_chart(fig_p, width="stretch")
             else:
                 st.info("Sin meta cuantitativa detectable, solo se muestra la propuesta en texto.")
@@ -0,0 +1,280 @@
+# modules/compartido.py
+import os
+import sys
+import time
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional
+import numpy as np
+import pandas as pd
+from modules import telemetria
+
+CACHE_MB = float(os.environ.get("POBREZA_CACHE_MB", "512"))
+# Refresco en segundo plano (stale-while-revalidate): cada fuente se recarga en un
+# momento aleatorio entre el 75% y el 90% de su ttl, así no vencen todas a la vez
+REFRESCO_FRACCION = (0.75, 0.9)
+REINTENTO_S = 60        # tras un refresco fallido (o un valor no aceptado)
+REVISION_S = 30         # cada cuánto revisa el hilo refrescador
+MAX_REFRESCOS = 2       # refrescos simultáneos como mucho
+
+
+def congelar(obj):
+    """
+    Marca como solo lectura los arrays numéricos de 'obj' (ndarray, Series,
+    DataFrame): una escritura en sitio desde cualquier sesión lanza ValueError en
+    vez de modificar los datos compartidos. Las columnas object (textos, ya
+    inmutables) se dejan escribibles porque pandas necesita ese buffer para
+    medirlas (memory_usage(deep=True)). Devuelve el mismo objeto.
+    """
+    if isinstance(obj, np.ndarray):
+        if obj.dtype != object:
+            obj.flags.writeable = False
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        for arr in getattr(obj._mgr, "arrays", []):
+            if isinstance(arr, np.ndarray) and arr.dtype != object:
+                arr.flags.writeable = False
+    return obj
+
+
+def vista(df: pd.DataFrame) -> pd.DataFrame:
+    """Vista sin copia de un DataFrame compartido (ya congelado): nuevas columnas no lo alteran."""
+    return df.copy(deep=False)
+
+
+def tamano(obj) -> int:
+    """Bytes aproximados de un valor cacheado."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    nbytes = getattr(obj, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    if isinstance(obj, dict):
+        return sum(tamano(v) for v in obj.values())
+    return sys.getsizeof(obj)
+
+
+class _Entrada:
+    __slots__ = ("valor", "bytes", "creado", "expira", "aciertos", "ttl", "construir", "aceptar", "refrescar_en")
+
+    def __init__(self, valor, nbytes: int, ttl: Optional[float], construir: Optional[Callable] = None,
+                 aceptar: Optional[Callable] = None, aceptado: bool = True):
+        self.valor = valor
+        self.bytes = nbytes
+        self.creado = time.time()
+        self.aciertos = 0
+        self.ttl = ttl
+        self.construir = construir
+        self.aceptar = aceptar
+        self.refrescar_en = None
+        if construir is None or ttl is None:
+            self.expira = None if ttl is None else self.creado + ttl
+        else:
+            # Con refresco no vence: se sirve la última copia buena mientras se recarga
+            self.expira = None
+            self.refrescar_en = self.creado + (ttl * random.uniform(*REFRESCO_FRACCION) if aceptado
+                                               else min(REINTENTO_S, ttl))
+
+
+class SharedCache:
+    """
+    Caché de datos de referencia para todo el proceso (todas las sesiones).
+
+    Cada valor se construye una sola vez aunque lo pidan varias sesiones a la vez
+    (un lock por clave), se congela (congelar) y se entrega el mismo objeto a todos,
+    sin copias. Se acota por bytes: al superar 'max_bytes' se expulsan las entradas
+    usadas hace más tiempo (LRU). stats() informa uso de memoria y tasa de aciertos.
+
+    Con refrescar=True la entrada no vence: antes de su ttl se reconstruye en un
+    hilo de fondo (un solo refresco por clave en todo el proceso, MAX_REFRESCOS a
+    la vez) y mientras tanto se sigue entregando la última copia buena. Si la
+    recarga falla, o 'aceptar' la rechaza (p. ej. un panel vacío porque la API no
+    respondió), se conserva la copia anterior y se reintenta en REINTENTO_S.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._construyendo: Dict[Hashable, threading.Lock] = {}
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.refrescos = 0
+        self.refrescos_fallidos = 0
+        self._refrescando: set = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._revisor: Optional[threading.Thread] = None
+
+    def _vigente(self, key: Hashable) -> Optional[_Entrada]:
+        entrada = self._entradas.get(key)
+        if entrada is None:
+            return None
+        if entrada.expira is not None and time.time() >= entrada.expira:
+            self._quitar(key)
+            return None
+        return entrada
+
+    def get(self, key: Hashable, construir: Callable[[], object], ttl: Optional[float] = None,
+            nombre: Optional[str] = None, refrescar: bool = False,
+            aceptar: Optional[Callable[[object], bool]] = None):
+        """
+        Valor de 'key'; si no está (o expiró) se construye con construir(). Con
+        refrescar=True solo la primera carga es síncrona (ver la clase).
+        """
+        nombre = nombre or _nombre(key)
+        telemetria.cache_lookup(nombre)
+        with self._lock:
+            entrada = self._vigente(key)
+            if entrada is not None:
+                return self._acierto(key, entrada)
+            building = self._construyendo.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                # Otra sesión pudo construirlo mientras se esperaba el lock de la clave
+                entrada = self._vigente(key)
+                if entrada is not None:
+                    return self._acierto(key, entrada)
+            telemetria.cache_miss(nombre)
+            valor = congelar(construir())
+            if refrescar:
+                self.put(key, valor, ttl, construir, aceptar)
+            else:
+                self.put(key, valor, ttl)
+            with self._lock:
+                self.fallos += 1
+                self._construyendo.pop(key, None)
+            return valor
+
+    def _acierto(self, key: Hashable, entrada: _Entrada):
+        self._entradas.move_to_end(key)
+        entrada.aciertos += 1
+        self.aciertos += 1
+        self._programar(key, entrada)
+        return entrada.valor
+
+    def put(self, key: Hashable, valor, ttl: Optional[float] = None, construir: Optional[Callable] = None,
+            aceptar: Optional[Callable[[object], bool]] = None) -> None:
+        """Guarda 'valor'; con 'construir' (y ttl) la entrada se refresca en segundo plano."""
+        nbytes = tamano(valor)
+        aceptado = aceptar is None or bool(aceptar(valor))
+        with self._lock:
+            self._quitar(key)
+            if nbytes > self.max_bytes:
+                return  # no cabe: se entrega sin cachear
+            self._entradas[key] = _Entrada(valor, nbytes, ttl, construir, aceptar, aceptado)
+            if construir is not None and ttl is not None:
+                self._iniciar_revisor()
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                viejo, _ = next(iter(self._entradas.items()))
+                self._quitar(viejo)
+                self.expulsiones += 1
+
+    # --- refresco en segundo plano ---
+
+    def _programar(self, key: Hashable, entrada: _Entrada) -> None:
+        """Lanza el refresco de 'key' si ya toca y no hay otro en curso (con self._lock tomado)."""
+        if entrada.refrescar_en is None or key in self._refrescando or time.time() < entrada.refrescar_en:
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=MAX_REFRESCOS, thread_name_prefix="cache-refresco")
+        self._refrescando.add(key)
+        self._pool.submit(self._refrescar, key, entrada)
+
+    def _refrescar(self, key: Hashable, entrada: _Entrada) -> None:
+        nombre = _nombre(key)
+        try:
+            with telemetria.span("cache.refresh", cache=nombre):
+                valor = congelar(entrada.construir())
+            ok = entrada.aceptar is None or bool(entrada.aceptar(valor))
+        except Exception:
+            ok = False
+        try:
+            if ok:
+                self.put(key, valor, entrada.ttl, entrada.construir, entrada.aceptar)
+                telemetria.count("cache.refresh." + nombre)
+            else:
+                # Se sigue sirviendo la copia anterior
+                telemetria.count("cache.refresh_fallido." + nombre)
+        finally:
+            with self._lock:
+                if ok:
+                    self.refrescos += 1
+                else:
+                    self.refrescos_fallidos += 1
+                    entrada.refrescar_en = time.time() + REINTENTO_S
+                self._refrescando.discard(key)
+
+    def _iniciar_revisor(self) -> None:
+        """Hilo que refresca las entradas a tiempo aunque nadie las pida (con self._lock tomado)."""
+        if self._revisor is not None:
+            return
+        self._revisor = threading.Thread(target=self._revisar, name="cache-revisor", daemon=True)
+        self._revisor.start()
+
+    def _revisar(self) -> None:
+        while True:
+            time.sleep(REVISION_S)
+            with self._lock:
+                for key, entrada in list(self._entradas.items()):
+                    self._programar(key, entrada)
+
+    def _quitar(self, key: Hashable) -> None:
+        entrada = self._entradas.pop(key, None)
+        if entrada is not None:
+            self.bytes -= entrada.bytes
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        """Quita todas las entradas (o las de claves cuyo primer elemento es 'prefix')."""
+        with self._lock:
+            for key in list(self._entradas):
+                if prefix is None or _nombre(key) == prefix:
+                    self._quitar(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            ahora = time.time()
+            items: List[dict] = [{
+                "clave": _nombre(k),
+                "mb": round(e.bytes / 1e6, 3),
+                "aciertos": e.aciertos,
+                "edad_s": round(ahora - e.creado, 1),
+                "refresca_en_s": None if e.refrescar_en is None else round(max(e.refrescar_en - ahora, 0), 1),
+            } for k, e in self._entradas.items()]
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "mb": round(self.bytes / 1e6, 2),
+                "max_mb": round(self.max_bytes / 1e6, 2),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "refrescos": self.refrescos,
+                "refrescos_fallidos": self.refrescos_fallidos,
+                "tasa_acierto": round(self.aciertos / consultas, 3) if consultas else None,
+                "rss_max_mb": _rss_max_mb(),
+                "items": items,
+            }
+
+
+def _nombre(key: Hashable) -> str:
+    return str(key[0] if isinstance(key, tuple) else key)
+
+
+def _rss_max_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    return round(rss / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+# Caché compartida por defecto del proceso
+cache = SharedCache(int(CACHE_MB * 1e6))
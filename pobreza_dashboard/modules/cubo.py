@@ -0,0 +1,173 @@
+# modules/cubo.py
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Set
+
+COUNT_COLS = ["nvpov", "vpov", "pov", "epov"]
+SHARE_COLS = [f"{c}_pct" for c in COUNT_COLS]
+DELTA_COLS = [f"{c}_delta" for c in COUNT_COLS] + ["pov_pct_delta"]
+NACIONAL = "Perú (suma nacional)"
+
+
+def _derive(cells: pd.DataFrame) -> pd.DataFrame:
+    """
+    Añade total, participaciones (%) y variaciones interanuales a celdas indexadas
+    por (region, year) u (year). La población total es nvpov + vpov + pov
+    (epov es un subconjunto de pov).
+    """
+    out = cells[COUNT_COLS].astype("float64")
+    out["total"] = out["nvpov"] + out["vpov"] + out["pov"]
+    total = out["total"].where(out["total"] > 0)
+    for c in COUNT_COLS:
+        out[f"{c}_pct"] = out[c] / total * 100.0
+    by_region = "region" in (out.index.names or [])
+    prev = out.groupby(level="region", sort=False).shift(1) if by_region else out.shift(1)
+    # Solo hay variación si el año anterior es exactamente year - 1
+    years = out.index.get_level_values("year")
+    prev_years = (pd.Series(years, index=out.index).groupby(level="region", sort=False).shift(1)
+                  if by_region else pd.Series(years, index=out.index).shift(1))
+    consecutive = (prev_years == years - 1).to_numpy()
+    for c in COUNT_COLS:
+        out[f"{c}_delta"] = np.where(consecutive, out[c] - prev[c], np.nan)
+    out["pov_pct_delta"] = np.where(consecutive, out["pov_pct"] - prev["pov_pct"], np.nan)
+    return out
+
+
+class PovertyCube:
+    """
+    Cubo precalculado region × year × categoría (nvpov, vpov, pov, epov).
+
+    Guarda por celda los conteos, la participación de cada categoría (%), las
+    variaciones interanuales y el ranking de regiones por pobreza en cada año, más
+    los mismos agregados a nivel nacional. append() solo agrega el panel nuevo y
+    recalcula las regiones y años que cambian; las consultas son lecturas del cubo.
+    Una celda (region, year) que vuelve a llegar reemplaza a la anterior.
+    """
+
+    def __init__(self):
+        index = pd.MultiIndex.from_arrays([pd.Index([], dtype=object), pd.Index([], dtype="int64")],
+                                          names=["region", "year"])
+        self._cells = pd.DataFrame(columns=COUNT_COLS, index=index, dtype="float64")
+        self._national_counts = pd.DataFrame(columns=COUNT_COLS, index=pd.Index([], dtype="int64", name="year"),
+                                             dtype="float64")
+        self.cells = _derive(self._cells).assign(rank_pov=pd.Series(dtype="Int64"))
+        self._national = _derive(self._national_counts)
+        self.sources: Set[str] = set()
+        # (token, revision) identifica el contenido actual del cubo (p. ej. en cachés de gráficos)
+        self.token = uuid.uuid4().hex
+        self.revision = 0
+
+    @classmethod
+    def from_panel(cls, df: pd.DataFrame) -> "PovertyCube":
+        cube = cls()
+        cube.append(df)
+        return cube
+
+    @classmethod
+    def from_frames(cls, cells: pd.DataFrame, national_counts: pd.DataFrame,
+                    sources: Iterable[str] = ()) -> "PovertyCube":
+        """
+        Restaura un cubo ya calculado (to_frame() y national_counts(), p. ej. desde
+        la instantánea offline) sin volver a agregar ni rankear.
+        """
+        cube = cls()
+        if not cells.empty:
+            cells = cells.astype({"region": str, "year": "int64"}).set_index(["region", "year"]).sort_index()
+            cube._cells = cells[COUNT_COLS].astype("float64")
+            cube.cells = cells[cube.cells.columns].astype({"rank_pov": "Int64"})
+            cube._national_counts = (national_counts.astype({"year": "int64"}).set_index("year")[COUNT_COLS]
+                                     .astype("float64").sort_index())
+            cube._national = _derive(cube._national_counts)
+        cube.sources = set(sources)
+        return cube
+
+    @property
+    def empty(self) -> bool:
+        return self._cells.empty
+
+    @property
+    def regions(self) -> List[str]:
+        return self._cells.index.get_level_values("region").unique().tolist()
+
+    @property
+    def years(self) -> List[int]:
+        return self._national.index.tolist()
+
+    def append(self, df: pd.DataFrame, source: Optional[str] = None) -> bool:
+        """
+        Incorpora un panel (region, year, nvpov, vpov, pov, epov). Si 'source' ya se
+        había añadido (p. ej. el hash del archivo) no hace nada y devuelve False.
+        """
+        if source is not None and source in self.sources:
+            return False
+        panel = df.dropna(subset=["region", "year"])
+        if panel.empty:
+            return False
+        region = panel["region"]
+        if not isinstance(region.dtype, pd.CategoricalDtype):
+            region = region.astype(str)
+        year = panel["year"].astype("int64").rename("year")
+        new = panel.groupby([region.rename("region"), year], observed=True)[COUNT_COLS].sum().astype("float64")
+        new.index = pd.MultiIndex.from_arrays(
+            [new.index.get_level_values("region").astype(str), new.index.get_level_values("year")],
+            names=["region", "year"])
+        new = new.sort_index()
+
+        # Totales nacionales: sumar lo nuevo y restar lo que se reemplaza
+        old = self._cells.reindex(new.index).fillna(0.0)
+        delta = (new - old).groupby(level="year").sum()
+        self._national_counts = self._national_counts.add(delta, fill_value=0.0).sort_index()
+
+        kept = self._cells.drop(new.index, errors="ignore")
+        self._cells = pd.concat([kept, new]).sort_index()
+
+        # Derivados solo de las regiones y años afectados
+        regions = new.index.get_level_values("region").unique()
+        years = new.index.get_level_values("year").unique()
+        affected = _derive(self._cells.loc[self._cells.index.get_level_values("region").isin(regions)])
+        cells = pd.concat([self.cells.drop(affected.index, errors="ignore")[affected.columns], affected]).sort_index()
+        self.cells = self._rank(cells, years)
+        self._national = _derive(self._national_counts)
+        if source is not None:
+            self.sources.add(source)
+        self.revision += 1
+        return True
+
+    def _rank(self, cells: pd.DataFrame, years: Iterable[int]) -> pd.DataFrame:
+        rank = self.cells["rank_pov"].reindex(cells.index).astype("Int64")
+        in_years = cells.index.get_level_values("year").isin(list(years))
+        # Se recalcula el ranking de los años afectados; el resto se conserva
+        ranked = cells.loc[in_years, "pov_pct"].groupby(level="year").rank(ascending=False, method="min")
+        rank.loc[ranked.index] = ranked.astype("Int64")
+        return cells.assign(rank_pov=rank)
+
+    # --- consultas ---
+
+    def national(self, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """Totales nacionales, participaciones y variaciones por año."""
+        return self._national.loc[start:end].reset_index().assign(region=NACIONAL)
+
+    def region(self, region: str, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """Serie de una región (con ranking anual)."""
+        if region not in self.regions:
+            return self.cells.iloc[0:0].reset_index()
+        return self.cells.loc[region].loc[start:end].reset_index().assign(region=region)
+
+    def year(self, year: int) -> pd.DataFrame:
+        """Todas las regiones en un año, ordenadas por ranking de pobreza."""
+        sub = self.cells.xs(year, level="year", drop_level=False) if year in self.years else self.cells.iloc[0:0]
+        return sub.reset_index().sort_values("rank_pov")
+
+    def cell(self, region: str, year: int) -> Optional[pd.Series]:
+        try:
+            return self.cells.loc[(region, year)]
+        except KeyError:
+            return None
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.cells.reset_index()
+
+    def national_counts(self) -> pd.DataFrame:
+        """Conteos nacionales por año (sin derivados), para persistir el cubo."""
+        return self._national_counts.reset_index()
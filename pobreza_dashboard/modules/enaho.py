@@ -0,0 +1,136 @@
+# modules/enaho.py
+import io
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import pandas as pd
+from typing import Dict, List, Tuple
+from modules.utils import column_mapping, REQUIRED_COLS
+from modules.validacion import validar_panel, TOTAL_SYNONYMS
+from modules import telemetria
+
+logger = logging.getLogger("pobreza.enaho")
+
+ENAHO_CACHE_DIR = os.environ.get("ENAHO_CACHE_DIR", "data/enaho_cache")
+COUNT_COLS = ["nvpov", "vpov", "pov", "epov"]
+
+# Lector de Excel: calamine (Rust) si está instalado, si no openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_path(data: bytes, cache_dir: str = ENAHO_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, content_hash(data) + ".parquet")
+
+
+def _is_csv(filename: str) -> bool:
+    return filename.lower().endswith(".csv")
+
+
+def _read(data: bytes, filename: str, **kwargs) -> pd.DataFrame:
+    if _is_csv(filename):
+        try:
+            return pd.read_csv(io.BytesIO(data), **kwargs)
+        except UnicodeDecodeError:
+            return pd.read_csv(io.BytesIO(data), encoding="latin1", **kwargs)
+    return pd.read_excel(io.BytesIO(data), engine=EXCEL_ENGINE, **kwargs)
+
+
+def _column_projection(header: List) -> Dict:
+    """Columna original -> columna estándar, solo para las de REQUIRED_COLS."""
+    return {orig: std for orig, std in column_mapping(header).items() if std in REQUIRED_COLS}
+
+
+def compact_types(df: pd.DataFrame) -> pd.DataFrame:
+    """region categórica, year entero compacto (Int16) y conteos float32."""
+    region = df["region"]
+    region = region.where(region.isna(), region.astype(str).str.strip())
+    out = pd.DataFrame({"region": region.astype("category")})
+    out["year"] = pd.to_numeric(df["year"], errors="coerce").round().astype("Int16")
+    for c in COUNT_COLS:
+        out[c] = pd.to_numeric(df[c], errors="coerce").astype("float32")
+    return out
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_cache(df: pd.DataFrame, msgs: List[str], errores: pd.DataFrame, path: str) -> None:
+    """Panel tipado + informe de validación (mensajes y errores por fila) junto al Parquet."""
+    base = path[:-len(".parquet")]
+    _write_parquet(errores.astype({"columna": str, "regla": str, "valor": str}), base + ".errores.parquet")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump({"mensajes": msgs, "filas": int(len(df))}, f, ensure_ascii=False)
+    # El panel se escribe al final: su existencia marca la caché como completa
+    _write_parquet(df, path)
+
+
+def _read_cache(path: str) -> Tuple[pd.DataFrame, List[str], pd.DataFrame]:
+    base = path[:-len(".parquet")]
+    with open(base + ".json", encoding="utf-8") as f:
+        msgs = json.load(f)["mensajes"]
+    errores = pd.read_parquet(base + ".errores.parquet")
+    return pd.read_parquet(path, columns=REQUIRED_COLS), msgs, errores
+
+
+def cargar_panel_enaho(data: bytes, filename: str,
+                       cache_dir: str = ENAHO_CACHE_DIR) -> Tuple[pd.DataFrame, List[str], pd.DataFrame]:
+    """
+    Carga un panel ENAHO (Excel o CSV) subido por el usuario.
+
+    El contenido se identifica por su hash: la primera vez se lee solo la cabecera,
+    se proyectan las columnas de REQUIRED_COLS, se tipan de forma compacta y se
+    guardan en un Parquet en 'cache_dir'. Cargas posteriores del mismo archivo (en
+    esta u otra sesión) leen directamente ese Parquet.
+
+    Antes de tipar, el panel original se valida fila a fila (validacion.validar_panel);
+    el informe se guarda con la caché. Devuelve (df, mensajes, errores por fila);
+    si faltan columnas obligatorias df está vacío.
+    """
+    path = cache_path(data, cache_dir)
+    telemetria.cache_lookup("enaho_parquet")
+    if os.path.exists(path):
+        try:
+            return _read_cache(path)
+        except Exception:
+            pass  # caché corrupta o incompleta: se vuelve a convertir
+
+    telemetria.cache_miss("enaho_parquet")
+    with telemetria.span("enaho.parse", archivo=filename, engine=EXCEL_ENGINE) as sp:
+        header = list(_read(data, filename, nrows=0).columns)
+        projection = _column_projection(header)
+        # la columna de total (si existe) solo se lee para validar la suma de categorías
+        usecols = list(projection) + [c for c in header if str(c).strip().lower() in TOTAL_SYNONYMS][:1]
+        df = _read(data, filename, usecols=usecols)
+        df = df.rename(columns=projection)
+        sp.set(rows=len(df))
+    with telemetria.span("enaho.validate", rows=len(df)):
+        ok, msgs, errores = validar_panel(df)
+    if errores.empty and not ok:
+        # faltan columnas obligatorias
+        return pd.DataFrame(columns=REQUIRED_COLS), msgs, errores
+
+    df = compact_types(df[REQUIRED_COLS])
+    try:
+        _write_cache(df, msgs, errores, path)
+    except OSError as e:
+        logger.warning("No se pudo guardar la caché del panel ENAHO: %s", e)
+    return df, msgs, errores
@@ -0,0 +1,105 @@
+# modules/graficos.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from modules import telemetria
+
+MAX_PUNTOS = 2_000       # puntos enviados al navegador por gráfico (tras reducir)
+UMBRAL_WEBGL = 1_000     # por encima se usan trazas WebGL (scattergl)
+MAX_FIGURAS = 64
+
+_lock = threading.Lock()
+_figuras: "OrderedDict[Hashable, go.Figure]" = OrderedDict()
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Huella del contenido (columnas, tipos y valores) de un DataFrame."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def figura(clave: Hashable, construir: Callable[[], go.Figure]) -> go.Figure:
+    """
+    Memo LRU de figuras por proceso: 'clave' debe identificar los datos (huella)
+    y los parámetros de la vista. La figura devuelta se comparte: no modificarla.
+    """
+    telemetria.cache_lookup("graficos")
+    with _lock:
+        fig = _figuras.get(clave)
+        if fig is not None:
+            _figuras.move_to_end(clave)
+            return fig
+    telemetria.cache_miss("graficos")
+    with telemetria.span("graficos.build"):
+        fig = construir()
+    with _lock:
+        _figuras[clave] = fig
+        while len(_figuras) > MAX_FIGURAS:
+            _figuras.popitem(last=False)
+    return fig
+
+
+def reducir(df: pd.DataFrame, x: str, y: str, color: Optional[str] = None,
+            max_puntos: int = MAX_PUNTOS) -> pd.DataFrame:
+    """
+    Reduce series densas a como mucho ~max_puntos en total, repartidos entre las
+    series de 'color'. Cada serie se ordena por x y se parte en tramos; de cada
+    tramo se conservan el mínimo y el máximo de y (los picos no desaparecen),
+    además del primer y último punto de la serie.
+    """
+    df = df.dropna(subset=[y])
+    if len(df) <= max_puntos:
+        return df
+    keys = [color] if color else []
+    d = df.sort_values(keys + [x], kind="stable").reset_index(drop=True)
+    if color:
+        grupos = d.groupby(color, observed=True, sort=False)
+        pos = grupos.cumcount().to_numpy()
+        tam = grupos[x].transform("size").to_numpy()
+        n_series = grupos.ngroups
+    else:
+        pos = np.arange(len(d))
+        tam = np.full(len(d), len(d))
+        n_series = 1
+    tramos = max(max_puntos // (2 * n_series), 1)
+    tramo = pos * tramos // tam
+    por_tramo = d[y].groupby([d[color].to_numpy() if color else np.zeros(len(d)), tramo], sort=False)
+    keep = np.zeros(len(d), dtype=bool)
+    keep[por_tramo.idxmin().to_numpy()] = True
+    keep[por_tramo.idxmax().to_numpy()] = True
+    keep |= (pos == 0) | (pos == tam - 1)
+    return d[keep]
+
+
+def lineas(df: pd.DataFrame, x: str, y: str, color: Optional[str] = None, title: Optional[str] = None,
+           labels: Optional[Dict[str, str]] = None, markers: bool = True, clave: Optional[Hashable] = None,
+           max_puntos: int = MAX_PUNTOS) -> go.Figure:
+    """
+    px.line memoizado y reducido. 'clave' identifica los datos de 'df' (por
+    ejemplo la versión de un cubo); si no se da se calcula la huella de df.
+    Por encima de UMBRAL_WEBGL puntos se dibuja con WebGL y sin marcadores.
+    """
+    cols = [c for c in (x, y, color) if c]
+    datos = fingerprint(df[cols]) if clave is None else clave
+    key = ("lineas", datos, x, y, color, title, tuple(sorted((labels or {}).items())), markers, max_puntos)
+
+    def construir():
+        d = reducir(df[cols], x, y, color, max_puntos)
+        webgl = len(d) > UMBRAL_WEBGL
+        return px.line(d, x=x, y=y, color=color, title=title, labels=labels or {},
+                       markers=markers and not webgl, render_mode="webgl" if webgl else "svg")
+
+    return figura(key, construir)
+
+
+def barras(x, y, labels: Optional[Dict[str, str]] = None) -> go.Figure:
+    """px.bar memoizado por valores (gráficos pequeños, p. ej. oficial vs. meta)."""
+    key = ("barras", tuple(x), tuple(float(v) for v in y), tuple(sorted((labels or {}).items())))
+    return figura(key, lambda: px.bar(x=list(x), y=list(y), labels=labels or {}))
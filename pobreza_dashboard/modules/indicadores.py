@@ -2,53 +2,134 @@
 import os
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from scraping_ipe import descargar_datos_pobreza_peru
+from scraping_ipe import descargar_panel_pares, PAISES_PARES
+from modules.panel import IndicatorPanel, panel_oficial, normalize_series, PAIS_DEFAULT
+from modules.enaho import cargar_panel_enaho, content_hash
+from modules.cubo import PovertyCube, SHARE_COLS
+from modules.snapshot import snapshot_actual, OFFLINE
+from modules import telemetria, graficos
+from modules.compartido import cache
 
 CACHE_TTL = 60 * 60 * 6  # 6 horas
 LOCAL_BACKUP_CSV = "data/pobreza_wb_backup.csv"
 LOCAL_BACKUP_XLSX = "data/pobreza_local_ejemplo.xlsx"
 
-@st.cache_data(ttl=CACHE_TTL)
-def _get_poverty_wb_cached():
-    """Intentar descargar desde World Bank; si falla devuelve DataFrame vacío."""
-    try:
-        df = descargar_datos_pobreza_peru(compute_counts=True)
-        return df
-    except Exception:
-        return pd.DataFrame()
+def _get_peers_panel():
+    """Panel indexado de pobreza de Perú y pares regionales (una sola lectura del indicador)."""
+    return cache.get(("peers_panel",), _construir_peers_panel, ttl=CACHE_TTL,
+                     refrescar=True, aceptar=lambda p: not p.empty)
+
+def _construir_peers_panel():
+    df = pd.DataFrame() if OFFLINE else descargar_panel_pares("SI.POV.DDAY", list(PAISES_PARES))
+    snap = snapshot_actual()
+    if df.empty and snap is not None and snap.has("pares"):
+        df = snap.frame("pares")
+    if df is None or df.empty:
+        return IndicatorPanel.empty_panel()
+    return IndicatorPanel(df.assign(indicator="pov_pct"))
 
 def _try_load_local_backup():
     """Intentar cargar archivos de respaldo locales (CSV o XLSX)."""
     if os.path.exists(LOCAL_BACKUP_CSV):
         try:
             df = pd.read_csv(LOCAL_BACKUP_CSV)
-            # Normalizar nombres de columnas esperadas
-            if "year" not in df.columns:
-                # aceptar 'Año' u otras variantes
-                if "Año" in df.columns:
-                    df = df.rename(columns={"Año":"year"})
-            return df
+            # Normalizar nombres de columnas esperadas ('Año' u otras variantes)
+            return normalize_series(df)
         except Exception:
             return pd.DataFrame()
     if os.path.exists(LOCAL_BACKUP_XLSX):
         try:
             df = pd.read_excel(LOCAL_BACKUP_XLSX)
-            if "Año" in df.columns and "Pobreza (%)" in df.columns:
-                df = df.rename(columns={"Año":"year", "Pobreza (%)":"pov_pct"})
-            return df
+            return normalize_series(df)
         except Exception:
             return pd.DataFrame()
     return pd.DataFrame()
 
+def _get_cubo_sesion() -> PovertyCube:
+    """Cubo regional de la sesión: los paneles subidos se van agregando a él."""
+    if "enaho_cubo" not in st.session_state:
+        # Si la instantánea trae el cubo precalculado, la sesión parte de él
+        snap = snapshot_actual()
+        if snap is not None and snap.has("cubo_celdas"):
+            cubo = PovertyCube.from_frames(snap.frame("cubo_celdas"), snap.frame("cubo_nacional"),
+                                           snap.manifest.get("enaho_fuentes", []))
+        else:
+            cubo = PovertyCube()
+        st.session_state["enaho_cubo"] = cubo
+    return st.session_state["enaho_cubo"]
+
+def _mostrar_paneles_enaho():
+    """Carga opcional de paneles regionales ENAHO (convertidos una vez a Parquet)."""
+    st.markdown("---")
+    st.subheader("Paneles regionales ENAHO (opcional)")
+    uploads = st.file_uploader("Sube uno o más paneles ENAHO (Excel/CSV) con columnas region, year, nvpov, vpov, pov, epov", type=["xlsx","xls","csv"], accept_multiple_files=True, key="enaho_upl")
+    cubo = _get_cubo_sesion()
+    for uploaded in uploads or []:
+        data = uploaded.getvalue()
+        source = content_hash(data)
+        if source in cubo.sources:
+            continue
+        try:
+            with telemetria.span("enaho.ingest", archivo=uploaded.name, bytes=len(data)):
+                df_enaho, msgs, errores = cargar_panel_enaho(data, uploaded.name)
+        except Exception as e:
+            st.error(f"No se pudo leer el panel ENAHO '{uploaded.name}'.")
+            st.exception(e)
+            continue
+        for m in msgs:
+            st.warning(f"{uploaded.name}: {m}")
+        if not errores.empty:
+            with st.expander(f"Errores por fila en {uploaded.name} ({len(errores):,} mostrados)"):
+                st.dataframe(errores, width="stretch")
+                st.download_button("Descargar informe de errores (CSV)", data=errores.to_csv(index=False).encode("utf-8"),
+                                   file_name="errores_panel_enaho.csv", mime="text/csv", key=f"err_{source}")
+        if not df_enaho.empty:
+            with telemetria.span("enaho.cubo_append", rows=len(df_enaho)):
+                cubo.append(df_enaho, source=source)
+            st.success(f"Panel '{uploaded.name}' agregado: {len(df_enaho):,} filas.")
+
+    if cubo.empty:
+        return
+    st.caption(f"Cubo regional: {len(cubo.regions)} regiones × {len(cubo.years)} años.")
+    nacional = cubo.national()
+    total_long = nacional.melt(id_vars=["region", "year"], value_vars=SHARE_COLS, var_name="categoria", value_name="porcentaje")
+    with telemetria.span("indicadores.plot.enaho_nacional"):
+        fig = graficos.lineas(total_long, x="year", y="porcentaje", color="categoria",
+                              title="Perú (suma nacional): participación por categoría de pobreza (%) - ENAHO",
+                              clave=("enaho_nacional", cubo.token, cubo.revision))
+        st.plotly_chart(fig, width="stretch")
+
+    # Todas las regiones: con muchos años se reduce y se dibuja con WebGL
+    regional = cubo.to_frame()[["region", "year", "pov_pct"]]
+    with telemetria.span("indicadores.plot.enaho_regional", points=len(regional)):
+        fig_r = graficos.lineas(regional, x="year", y="pov_pct", color="region",
+                                title="Pobreza (%) por región - ENAHO", labels={"pov_pct": "% pobreza", "region": "Región"},
+                                clave=("enaho_regional", cubo.token, cubo.revision))
+        st.plotly_chart(fig_r, width="stretch")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        region_sel = st.selectbox("Región", cubo.regions, key="enaho_region")
+        serie = cubo.region(region_sel)
+        st.dataframe(serie[["year", "pov", "pov_pct", "pov_pct_delta", "rank_pov"]].rename(columns={
+            "year": "Año", "pov": "Personas en pobreza", "pov_pct": "Pobreza (%)",
+            "pov_pct_delta": "Var. anual (pp)", "rank_pov": "Ranking"}), width="stretch")
+    with col2:
+        year_sel = st.selectbox("Año", cubo.years[::-1], key="enaho_year")
+        ranking = cubo.year(year_sel)
+        st.dataframe(ranking[["rank_pov", "region", "pov_pct", "epov_pct"]].rename(columns={
+            "rank_pov": "Ranking", "region": "Región", "pov_pct": "Pobreza (%)", "epov_pct": "Pobreza extrema (%)"}),
+            width="stretch")
+
 def mostrar_indicadores():
     st.header("Indicadores básicos")
     st.markdown("Descarga indicadores oficiales y ofrece una vista rápida de la evolución.")
 
-    df_wb = _get_poverty_wb_cached()
+    # Panel compartido con el comparador (normalizado e indexado una sola vez)
+    panel = panel_oficial()
 
     # Si la descarga falló, intentar backups locales
-    if df_wb is None or df_wb.empty:
+    if panel.empty:
         st.warning("No se pudo descargar la serie de pobreza desde el Banco Mundial (o la descarga falló).")
         st.info("Puedes subir un archivo de respaldo (CSV/XLSX) con la serie, o usar un backup local si existe.")
         # Intentar cargar backup local
@@ -72,39 +153,51 @@ def mostrar_indicadores():
                 st.info("No hay datos disponibles. Sube un archivo o revisa la conectividad con World Bank.")
                 return
 
-    # Ahora df_wb contiene datos para mostrar (si no, se habría retornado arriba)
-    # Normalizar nombres (aceptar varias convenciones)
-    if "year" not in df_wb.columns and "Año" in df_wb.columns:
-        df_wb = df_wb.rename(columns={"Año":"year"})
-    if "pov_pct" not in df_wb.columns and "Pobreza (%)" in df_wb.columns:
-        df_wb = df_wb.rename(columns={"Pobreza (%)":"pov_pct"})
-    if "population" not in df_wb.columns and "population" in df_wb.columns:
-        pass  # nothing
-    # Try to coerce types safely
-    try:
-        df_wb["year"] = pd.to_numeric(df_wb["year"], errors="coerce").astype("Int64")
-    except Exception:
-        pass
-
-    years = sorted(df_wb["year"].dropna().unique().tolist())
+        panel = IndicatorPanel.from_series(df_wb)
+
+    years = panel.years(PAIS_DEFAULT)
     if not years:
         st.error("No hay años válidos en la serie cargada.")
         return
 
     rango = st.slider("Rango de años", int(min(years)), int(max(years)), (int(min(years)), int(max(years))))
-    view = df_wb[(df_wb["year"] >= rango[0]) & (df_wb["year"] <= rango[1])].sort_values("year")
+    view = panel.frame(PAIS_DEFAULT, rango[0], rango[1])
 
     st.subheader("Pobreza (%) - Serie")
-    fig = px.line(view, x="year", y="pov_pct", markers=True, title="Pobreza (% de población) - World Bank (Perú)")
-    st.plotly_chart(fig, width="stretch")
+    with telemetria.span("indicadores.plot.pov_pct", points=len(view)):
+        fig = graficos.lineas(view, x="year", y="pov_pct", title="Pobreza (% de población) - World Bank (Perú)",
+                              clave=("pov_pct", panel.fingerprint, rango))
+        st.plotly_chart(fig, width="stretch")
 
     st.subheader("Pobreza - Estimación de personas (si está disponible)")
     if "pov_count" in view.columns:
-        fig2 = px.line(view, x="year", y="pov_count", markers=True, title="Personas en pobreza (estimadas)")
-        st.plotly_chart(fig2, width="stretch")
+        with telemetria.span("indicadores.plot.pov_count", points=len(view)):
+            fig2 = graficos.lineas(view, x="year", y="pov_count", title="Personas en pobreza (estimadas)",
+                                   clave=("pov_count", panel.fingerprint, rango))
+            st.plotly_chart(fig2, width="stretch")
     else:
         st.info("No se encontró columna 'pov_count'. Si quieres, sube un CSV que incluya población para calcular conteos.")
 
+    st.subheader("Comparación regional: Perú y países pares")
+    peers = _get_peers_panel()
+    if peers.empty:
+        st.info("No se pudo obtener la serie de países pares.")
+    else:
+        nombres = list(PAISES_PARES.values())
+        sel = st.multiselect("Países / agregados", nombres, default=nombres, key="peers_sel")
+        frames = [peers.slice(code, "pov_pct", rango[0], rango[1]).reset_index().assign(country=nombre)
+                  for code, nombre in PAISES_PARES.items() if nombre in sel]
+        peers_view = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if peers_view.empty:
+            st.info("Sin datos de pares para la selección y el rango de años.")
+        else:
+            with telemetria.span("indicadores.plot.pares", points=len(peers_view)):
+                fig3 = graficos.lineas(peers_view, x="year", y="pov_pct", color="country",
+                                       title="Pobreza (% de población) - Perú vs. pares",
+                                       labels={"pov_pct": "% pobreza", "country": "País"},
+                                       clave=("pares", peers.fingerprint, rango, tuple(sel)))
+                st.plotly_chart(fig3, width="stretch")
+
     st.markdown("**Tabla de datos**")
     # Friendly rename for display if necessary
     df_display = view.copy()
@@ -120,3 +213,5 @@ def mostrar_indicadores():
     if rename_map:
         df_display = df_display.rename(columns=rename_map)
     st.dataframe(df_display, width="stretch")
+
+    _mostrar_paneles_enaho()
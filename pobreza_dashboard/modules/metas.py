@@ -0,0 +1,182 @@
+# modules/metas.py
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+# Columnas que añade extraer_metas()
+META_COLS = ["meta_valor", "meta_tipo", "meta_indicador", "meta_horizonte", "meta_anio", "menciona_reduccion"]
+
+# Patrones precompilados (se aplican sobre texto en minúsculas y sin tildes)
+_NUM = r"(\d{1,3}(?:[.,]\d+)?)(?!\d)"
+_PCT = r"\s*(?:%|por\s*ciento)"
+PATRONES = {
+    # "reducir la pobreza en 50%" -> reducción relativa
+    "relativa": re.compile(r"(?:reduc|disminu|baj|recort)\w*[^.%]*?\ben\s+(?:un\s+)?" + _NUM + _PCT),
+    # "reducir pov 50%" -> reducción relativa, salvo que la cifra siga a una
+    # preposición de nivel ("reducir a 10%", "bajar al 10%": nivel objetivo)
+    "relativa_directa": re.compile(r"(?:reduc|disminu|baj|recort)\w*((?:\s+[^\s\d.%]+)*?)\s+" + _NUM + _PCT),
+    # "reducir en 5 puntos" -> reducción en puntos porcentuales
+    "puntos": re.compile(r"\ben\s+(?:unos\s+)?" + _NUM + r"\s+puntos?\b"),
+    # "a la mitad"
+    "mitad": re.compile(r"\bmitad\b"),
+    # "a 0", "al 10%", "por debajo del 12%" -> nivel objetivo
+    "nivel": re.compile(r"\b(?:a|al|hasta(?:\s+el)?|por\s+debajo\s+del?|menos\s+del?)\s+" + _NUM
+                        + r"(?:" + _PCT + r")?(?!\s*(?:anos?|mil|millones|meses)\b)"),
+    # "erradicar", "eliminar", "cero pobreza" -> nivel 0
+    "cero": re.compile(r"\b(?:erradicar|eliminar|acabar\s+con)\b|\bcero\b"),
+    # cualquier "NN%" suelto -> nivel objetivo (solo si el texto habla de pobreza o de reducir)
+    "pct": re.compile(_NUM + _PCT),
+    "horizonte": re.compile(r"\ben\s+(\d{1,2})\s+anos?\b"),
+    "anio": re.compile(r"\b(20\d{2})\b"),
+    "extrema": re.compile(r"\bextrema\b|\bepov\b"),
+    "pobreza": re.compile(r"\bpobre|\bpov\b"),
+    "reducir": re.compile(r"\b(?:reduc|disminu|baj|recort)"),
+}
+
+# Palabras que, justo antes de la cifra, la convierten en un nivel ("a 10%", "hasta el 10%")
+_PREP_NIVEL = {"a", "al", "hasta", "el", "de", "del", "debajo"}
+
+# Memo por hash del texto: cada propuesta se analiza una sola vez por proceso
+# (LRU acotado; se usa desde la UI y desde la ingesta en segundo plano)
+_MEMO: "OrderedDict[str, Tuple]" = OrderedDict()
+_MEMO_MAX = 100_000
+_MEMO_LOCK = threading.Lock()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _fold(texts: pd.Series) -> pd.Series:
+    """Minúsculas y sin tildes, vectorizado (equivalente a utils.normalize_str)."""
+    return (texts.fillna("").astype(str).str.strip().str.lower()
+            .str.normalize("NFD").str.replace(r"[\u0300-\u036f]", "", regex=True))
+
+
+def _num(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s.str.replace(",", ".", regex=False), errors="coerce")
+
+
+def _analizar(texts: pd.Series, fechas: pd.Series) -> pd.DataFrame:
+    """Aplica todos los patrones sobre un lote de textos ya normalizados."""
+    def ext(name):
+        return texts.str.extract(PATRONES[name], expand=False)
+
+    def has(name):
+        return texts.str.contains(PATRONES[name], regex=True)
+
+    relativa = _num(ext("relativa"))
+    directa = texts.str.extract(PATRONES["relativa_directa"])
+    previa = directa[0].fillna("").str.split().str[-1]
+    relativa = relativa.fillna(_num(directa[1]).where(~previa.isin(_PREP_NIVEL)))
+    puntos = _num(ext("puntos"))
+    nivel = _num(ext("nivel"))
+    pct = _num(ext("pct"))
+    mitad = has("mitad")
+    cero = has("cero")
+    extrema = has("extrema")
+    pobreza = has("pobreza")
+    reducir = has("reducir")
+    # "Invertir 2% del PBI" no es una meta de pobreza: los niveles y % sueltos
+    # solo cuentan si el texto menciona la pobreza o una reducción
+    contexto = extrema | pobreza | reducir
+
+    # Prioridad: relativa > puntos > mitad > nivel > cero > % suelto
+    conds = [relativa.notna(), puntos.notna(), mitad, nivel.notna() & contexto, cero, pct.notna() & contexto]
+    valor = np.select(conds, [relativa, puntos, 50.0, nivel, 0.0, pct], default=np.nan)
+    tipo = np.select(conds, ["relativa", "puntos", "relativa", "absoluta", "absoluta", "absoluta"], default=None)
+    valor = pd.Series(valor, index=texts.index, dtype=float)
+    tipo = pd.Series(tipo, index=texts.index, dtype=object)
+    # Valores fuera de 0-100 no son metas de pobreza plausibles
+    invalid = (valor < 0) | (valor > 100)
+    valor = valor.mask(invalid)
+    tipo = tipo.mask(invalid | valor.isna())
+
+    indicador = pd.Series(np.where(extrema, "pobreza_extrema",
+                                   np.where(pobreza, "pobreza", None)), index=texts.index, dtype=object)
+    indicador = indicador.where(tipo.notna())
+
+    anio = _num(ext("anio"))
+    horizonte = _num(ext("horizonte"))
+    fecha_anio = pd.to_datetime(fechas, errors="coerce").dt.year
+    horizonte = horizonte.fillna(anio - fecha_anio).where(lambda h: h > 0)
+
+    return pd.DataFrame({
+        "meta_valor": valor,
+        "meta_tipo": tipo,
+        "meta_indicador": indicador,
+        "meta_horizonte": horizonte.astype("Int64"),
+        "meta_anio": anio.astype("Int64"),
+        "menciona_reduccion": reducir,
+    })
+
+
+def extraer_metas(df: pd.DataFrame, text_col: str = "propuesta", date_col: str = "fecha") -> pd.DataFrame:
+    """
+    Devuelve una copia de 'df' con columnas estructuradas de meta cuantitativa:
+      - meta_valor (float): cifra de la meta
+      - meta_tipo: 'absoluta' (nivel objetivo en %), 'relativa' (% de reducción) o 'puntos'
+      - meta_indicador: 'pobreza' o 'pobreza_extrema'
+      - meta_horizonte (Int64): años hasta la meta ("en 5 años" o año objetivo - fecha)
+      - meta_anio (Int64): año objetivo si se menciona
+      - menciona_reduccion (bool): habla de reducir aunque no haya cifra
+
+    Solo se analizan los textos no vistos antes (memo por hash); el resto sale del memo.
+    """
+    out = df.copy()
+    if df.empty or text_col not in df.columns:
+        for c in META_COLS:
+            out[c] = pd.Series(dtype=object)
+        return out
+
+    texts = df[text_col].fillna("").astype(str)
+    fechas = df[date_col].astype(str) if date_col in df.columns else pd.Series("", index=df.index)
+    # La fecha influye en el horizonte, así que forma parte de la clave
+    keys = [_text_hash(t + "\x1f" + f) for t, f in zip(texts, fechas)]
+    keys = pd.Series(keys, index=df.index)
+
+    # El lote se arma en un dict local: expulsar del memo no afecta a este lote
+    with _MEMO_LOCK:
+        lote: Dict[str, Tuple] = {k: _MEMO[k] for k in set(keys) if k in _MEMO}
+        for k in lote:
+            _MEMO.move_to_end(k)
+    missing = ~keys.isin(list(lote))
+    if missing.any():
+        nuevos = keys[missing].drop_duplicates()
+        res = _analizar(_fold(texts[nuevos.index]), fechas[nuevos.index])
+        analizados = dict(zip(nuevos, res[META_COLS].itertuples(index=False, name=None)))
+        lote.update(analizados)
+        with _MEMO_LOCK:
+            _MEMO.update(analizados)
+            while len(_MEMO) > _MEMO_MAX:
+                _MEMO.popitem(last=False)
+
+    metas = pd.DataFrame([lote[k] for k in keys], columns=META_COLS, index=df.index)
+    metas = metas.astype({"meta_valor": float, "meta_horizonte": "Int64", "meta_anio": "Int64",
+                          "menciona_reduccion": bool})
+    for c in META_COLS:
+        out[c] = metas[c]
+    return out
+
+
+def nivel_objetivo(metas: pd.DataFrame, actual_pct: float) -> pd.Series:
+    """Nivel de pobreza (%) que implica cada meta dado el valor oficial actual."""
+    valor = metas["meta_valor"].astype(float)
+    tipo = metas["meta_tipo"]
+    nivel = np.select(
+        [tipo == "absoluta", tipo == "relativa", tipo == "puntos"],
+        [valor, actual_pct * (1 - valor / 100.0), actual_pct - valor],
+        default=np.nan,
+    )
+    return pd.Series(np.clip(nivel, 0, None), index=metas.index, dtype=float)
+
+
+def ambicion(metas: pd.DataFrame, actual_pct: float) -> pd.Series:
+    """Reducción relativa implícita (% respecto al nivel actual) de cada meta."""
+    if not actual_pct:
+        return pd.Series(np.nan, index=metas.index, dtype=float)
+    return (1 - nivel_objetivo(metas, actual_pct) / actual_pct) * 100.0
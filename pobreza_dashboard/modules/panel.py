@@ -0,0 +1,189 @@
+# modules/panel.py
+import math
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from scraping_ipe import descargar_datos_pobreza_peru, INDICADORES_WB
+from modules.snapshot import snapshot_actual, OFFLINE
+from modules import telemetria
+from modules.compartido import cache, congelar
+
+CACHE_TTL = 60 * 60 * 6
+PAIS_DEFAULT = "PER"
+
+# Variantes de nombres de columna aceptadas en series subidas o de respaldo
+SERIES_RENAMES = {
+    "Año": "year",
+    "Pobreza (%)": "pov_pct",
+    "Population": "population",
+    "Población": "population",
+    "Personas en pobreza": "pov_count",
+}
+
+
+def normalize_series(df: pd.DataFrame) -> pd.DataFrame:
+    """Renombra variantes conocidas (Año, Pobreza (%), ...) y tipa 'year' como entero."""
+    renames = {k: v for k, v in SERIES_RENAMES.items() if k in df.columns and v not in df.columns}
+    df = df.rename(columns=renames)
+    if "year" in df.columns:
+        df = df.assign(year=pd.to_numeric(df["year"], errors="coerce").astype("Int64"))
+    return df
+
+
+class IndicatorPanel:
+    """
+    Panel en memoria indexado por (país, indicador, año).
+
+    Los datos se normalizan y tipan una sola vez al construirlo. Cada serie se guarda
+    con sus años ordenados y un diccionario año -> posición, de modo que:
+      - value(): consulta puntual en O(1)
+      - slice()/frame(): rangos de años por búsqueda binaria (O(log n))
+      - latest(): último valor disponible en O(1)
+
+    Es inmutable: sus arrays y vistas anchas son de solo lectura, así una misma
+    instancia se comparte entre sesiones (compartido.cache) sin copiarla.
+    """
+
+    def __init__(self, long: pd.DataFrame):
+        # long: columnas country_code, indicator, year, value
+        long = long.dropna(subset=["year", "value"])
+        long = long.astype({"country_code": str, "indicator": str})
+        long = long.assign(year=long["year"].astype(np.int64), value=long["value"].astype(float))
+        self.indicators: List[str] = list(pd.unique(long["indicator"]))
+        long = long.drop_duplicates(["country_code", "indicator", "year"], keep="last")
+        long = long.sort_values(["country_code", "indicator", "year"])
+        # Huella del contenido: identifica el panel en cachés de derivados (gráficos)
+        self.fingerprint: str = hashlib.blake2b(
+            pd.util.hash_pandas_object(long, index=False).to_numpy().tobytes(), digest_size=16).hexdigest()
+
+        self._series: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, Dict[int, int]]] = {}
+        for (country, indicator), g in long.groupby(["country_code", "indicator"], sort=False):
+            years = congelar(g["year"].to_numpy())
+            values = congelar(g["value"].to_numpy())
+            self._series[(country, indicator)] = (years, values, {int(y): k for k, y in enumerate(years)})
+        self.countries: List[str] = sorted({c for c, _ in self._series})
+        # Vistas anchas construidas aquí y no al pedirlas: el panel no cambia después
+        # de construirse (se comparte entre sesiones) y nbytes las cuenta todas
+        self._wide: Dict[str, pd.DataFrame] = {c: congelar(self._build_wide(c)) for c in self.countries}
+
+    @classmethod
+    def from_series(cls, df: Optional[pd.DataFrame], country_code: str = PAIS_DEFAULT) -> "IndicatorPanel":
+        """Construye el panel desde una serie ancha de un país (year, pov_pct, population, ...)."""
+        if df is None or df.empty:
+            return cls.empty_panel()
+        df = normalize_series(df)
+        if "year" not in df.columns:
+            return cls.empty_panel()
+        value_cols = [c for c in df.columns if c != "year"]
+        numeric = df[value_cols].apply(pd.to_numeric, errors="coerce")
+        numeric = numeric.loc[:, numeric.notna().any()]
+        long = numeric.assign(year=df["year"]).melt(id_vars="year", var_name="indicator", value_name="value")
+        long["country_code"] = country_code
+        return cls(long)
+
+    @classmethod
+    def from_long(cls, long: pd.DataFrame, names: Optional[Dict[str, str]] = None) -> "IndicatorPanel":
+        """Construye el panel desde el formato largo de scraping_ipe (códigos -> nombres cortos)."""
+        names = INDICADORES_WB if names is None else names
+        long = long.assign(indicator=long["indicator"].astype(str).map(lambda c: names.get(c, c)))
+        return cls(long)
+
+    @classmethod
+    def empty_panel(cls) -> "IndicatorPanel":
+        return cls(pd.DataFrame(columns=["country_code", "indicator", "year", "value"]))
+
+    @property
+    def empty(self) -> bool:
+        return not self._series
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria aproximada de las series y sus vistas anchas."""
+        series = sum(y.nbytes + v.nbytes + 100 * len(pos) for y, v, pos in self._series.values())
+        return series + sum(int(w.memory_usage(deep=True).sum()) for w in self._wide.values())
+
+    def has(self, country: str, indicator: str) -> bool:
+        return (country, indicator) in self._series
+
+    def value(self, country: str, indicator: str, year: int, default: float = math.nan) -> float:
+        """Valor puntual; devuelve 'default' si no existe."""
+        serie = self._series.get((country, indicator))
+        if serie is None:
+            return default
+        pos = serie[2].get(int(year))
+        return default if pos is None else float(serie[1][pos])
+
+    def slice(self, country: str, indicator: str, start: Optional[int] = None,
+              end: Optional[int] = None) -> pd.Series:
+        """Serie del indicador entre start y end (inclusive), indexada por año."""
+        serie = self._series.get((country, indicator))
+        if serie is None:
+            return pd.Series(dtype=float, name=indicator)
+        years, values, _ = serie
+        lo, hi = self._bounds(years, start, end)
+        return pd.Series(values[lo:hi], index=pd.Index(years[lo:hi], name="year"), name=indicator)
+
+    def latest(self, country: str, indicator: str) -> Optional[Tuple[int, float]]:
+        """(año, valor) más reciente disponible, o None."""
+        serie = self._series.get((country, indicator))
+        if serie is None or len(serie[0]) == 0:
+            return None
+        return int(serie[0][-1]), float(serie[1][-1])
+
+    def years(self, country: str = PAIS_DEFAULT, indicator: Optional[str] = None) -> List[int]:
+        """Años con dato para un indicador (o para cualquiera si indicator es None), ordenados."""
+        if indicator is not None:
+            serie = self._series.get((country, indicator))
+            return [] if serie is None else serie[0].tolist()
+        return self._frame_full(country)["year"].tolist()
+
+    def frame(self, country: str = PAIS_DEFAULT, start: Optional[int] = None,
+              end: Optional[int] = None) -> pd.DataFrame:
+        """Vista ancha (year + una columna por indicador) del rango pedido."""
+        full = self._frame_full(country)
+        lo, hi = self._bounds(full["year"].to_numpy(), start, end)
+        return full.iloc[lo:hi].reset_index(drop=True)
+
+    def row(self, country: str, year: int) -> Dict[str, float]:
+        """Todos los indicadores de un país en un año: {indicador: valor}."""
+        return {ind: self.value(country, ind, year) for ind in self.indicators if self.has(country, ind)}
+
+    def _frame_full(self, country: str) -> pd.DataFrame:
+        full = self._wide.get(country)
+        return self._build_wide(country) if full is None else full
+
+    def _build_wide(self, country: str) -> pd.DataFrame:
+        cols = {ind: self.slice(country, ind) for ind in self.indicators if self.has(country, ind)}
+        if cols:
+            return pd.DataFrame(cols).sort_index().rename_axis("year").reset_index()
+        return pd.DataFrame({"year": pd.Series(dtype=np.int64)})
+
+    @staticmethod
+    def _bounds(years: np.ndarray, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        lo = 0 if start is None else int(np.searchsorted(years, start, side="left"))
+        hi = len(years) if end is None else int(np.searchsorted(years, end, side="right"))
+        return lo, hi
+
+
+def _construir_panel_oficial() -> IndicatorPanel:
+    snap = snapshot_actual()
+    try:
+        df = pd.DataFrame() if OFFLINE else descargar_datos_pobreza_peru(compute_counts=True)
+        if df.empty and snap is not None and snap.has("serie_peru"):
+            # Sin red (o modo offline): la serie ya derivada de la instantánea
+            df = snap.frame("serie_peru")
+        with telemetria.span("panel.build", rows=len(df)):
+            return IndicatorPanel.from_series(df)
+    except Exception:
+        return IndicatorPanel.empty_panel()
+
+
+def panel_oficial() -> IndicatorPanel:
+    """
+    Panel de la serie oficial (World Bank) compartido por todas las páginas y sesiones.
+    Se recarga en segundo plano antes de CACHE_TTL; si la descarga falla se sigue
+    sirviendo el último panel no vacío.
+    """
+    return cache.get(("panel_oficial",), _construir_panel_oficial, ttl=CACHE_TTL,
+                     refrescar=True, aceptar=lambda p: not p.empty)
@@ -0,0 +1,260 @@
+# modules/propuestas.py
+import io
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from modules.utils import PROPOSAL_COLS, normalize_proposals
+from modules.metas import extraer_metas, META_COLS
+from modules import telemetria
+
+PROPUESTAS_DB = os.environ.get("PROPUESTAS_DB", "data/propuestas.sqlite")
+FILTER_COLS = ["candidato", "partido", "tema"]
+ENCODINGS = ["utf-8-sig", "cp1252", "latin1"]   # latin1 decodifica cualquier byte: último recurso
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS propuestas (
+    id INTEGER PRIMARY KEY,
+    hash INTEGER NOT NULL UNIQUE,
+    candidato TEXT, partido TEXT, tema TEXT, propuesta TEXT, fuente TEXT, fecha TEXT,
+    meta_valor REAL, meta_tipo TEXT, meta_indicador TEXT,
+    meta_horizonte INTEGER, meta_anio INTEGER, menciona_reduccion INTEGER,
+    origen TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_propuestas_candidato ON propuestas(candidato);
+CREATE INDEX IF NOT EXISTS ix_propuestas_partido ON propuestas(partido);
+CREATE INDEX IF NOT EXISTS ix_propuestas_tema ON propuestas(tema);
+CREATE INDEX IF NOT EXISTS ix_propuestas_fecha ON propuestas(fecha);
+CREATE INDEX IF NOT EXISTS ix_propuestas_meta ON propuestas(meta_valor) WHERE meta_valor IS NOT NULL;
+CREATE TABLE IF NOT EXISTS archivos (
+    sha256 TEXT PRIMARY KEY,
+    nombre TEXT, encoding TEXT, filas INTEGER, nuevas INTEGER, ingestado TEXT
+);
+CREATE TABLE IF NOT EXISTS origenes (
+    origen TEXT PRIMARY KEY,
+    sha256 TEXT
+);
+"""
+
+
+def detectar_encoding(data: bytes) -> Tuple[str, str]:
+    """(texto, encoding) probando ENCODINGS en orden; se decodifica una sola vez."""
+    for enc in ENCODINGS:
+        try:
+            return data.decode(enc), enc
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("No se pudo decodificar el archivo")  # inalcanzable con latin1
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash (int64) del contenido normalizado de cada propuesta, para deduplicar."""
+    return pd.util.hash_pandas_object(df[PROPOSAL_COLS], index=False).to_numpy().view(np.int64)
+
+
+class ProposalStore:
+    """
+    Propuestas en SQLite con índices por candidato, partido, tema y fecha.
+
+    Cada ingesta (CSV del repo, subida por UI o instantánea) se identifica por el
+    sha256 de su contenido: un archivo ya ingerido no se vuelve a leer. Las subidas
+    solo agregan filas; con reemplazar=True (el CSV del repo) el archivo es la fuente
+    de verdad de su 'origen': una nueva versión sustituye, en la misma transacción,
+    las filas que ya no contiene (editadas o borradas). Las filas se normalizan, se deduplican por hash de contenido y se guardan con sus metas
+    ya extraídas (metas.extraer_metas), así que las vistas solo consultan las filas
+    que necesitan.
+    """
+
+    def __init__(self, path: str = PROPUESTAS_DB):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- ingesta ---
+
+    def ya_ingerido(self, sha256: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM archivos WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+    def _vigente(self, sha256: str, origen: Optional[str]) -> bool:
+        """True si no hay nada que ingerir: mismo archivo ya ingerido (o ya vigente para 'origen')."""
+        if origen is None:
+            return self.ya_ingerido(sha256)
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM origenes WHERE origen = ?", (origen,)).fetchone()
+        return row is not None and row[0] == sha256
+
+    def ingest_bytes(self, data: bytes, nombre: str, reemplazar: bool = False,
+                     origen: Optional[str] = None) -> dict:
+        """
+        Agrega un CSV de propuestas. Devuelve un resumen con filas leídas, nuevas,
+        duplicadas, retiradas, encoding detectado y si el archivo ya se había ingerido.
+        Con reemplazar=True sustituye las filas de 'origen' (por defecto 'nombre').
+        """
+        sha = hashlib.sha256(data).hexdigest()
+        origen = (origen or nombre) if reemplazar else None
+        if self._vigente(sha, origen):
+            return {"archivo": nombre, "filas": 0, "nuevas": 0, "duplicadas": 0, "retiradas": 0,
+                    "encoding": None, "repetido": True}
+        with telemetria.span("propuestas.parse", archivo=nombre, bytes=len(data)):
+            text, enc = detectar_encoding(data)
+            df = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+        res = self._insert(df, sha, nombre, enc, origen)
+        res["encoding"] = enc
+        return res
+
+    def ingest_csv(self, path: str, reemplazar: bool = False) -> dict:
+        with open(path, "rb") as f:
+            return self.ingest_bytes(f.read(), path, reemplazar)
+
+    def ingest_frame(self, df: pd.DataFrame, nombre: str, sha256: str, reemplazar: bool = False,
+                     origen: Optional[str] = None) -> dict:
+        """Agrega propuestas ya leídas (p. ej. de la instantánea), identificadas por 'sha256'."""
+        origen = (origen or nombre) if reemplazar else None
+        if self._vigente(sha256, origen):
+            return {"archivo": nombre, "filas": 0, "nuevas": 0, "duplicadas": 0, "retiradas": 0, "repetido": True}
+        return self._insert(df, sha256, nombre, None, origen)
+
+    def retirar(self, origen: str) -> int:
+        """Borra las filas de 'origen' (p. ej. el CSV del repo ya no existe). Devuelve cuántas."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM origenes WHERE origen = ?", (origen,))
+            return self._conn.execute("DELETE FROM propuestas WHERE origen = ?", (origen,)).rowcount
+
+    def _insert(self, df: pd.DataFrame, sha: str, nombre: str, enc: Optional[str],
+                reemplaza: Optional[str] = None) -> dict:
+        df = normalize_proposals(df)
+        df = df[PROPOSAL_COLS].fillna("").astype(str).apply(lambda s: s.str.strip())
+        df = df[(df != "").any(axis=1)]
+        keys = row_hashes(df)
+        df = df.assign(hash=keys).drop_duplicates("hash")
+        with self._lock:
+            known = self._known_hashes(df["hash"].tolist())
+        nuevas = df[~df["hash"].isin(known)]
+        # Metas se extraen una vez aquí, no en cada rerun de la página
+        with telemetria.span("propuestas.metas", rows=len(nuevas)):
+            nuevas = extraer_metas(nuevas)
+        cols = ["hash"] + PROPOSAL_COLS + META_COLS
+        rows = nuevas[cols].astype(object).where(nuevas[cols].notna(), None)
+        rows["menciona_reduccion"] = rows["menciona_reduccion"].map(lambda v: None if v is None else int(v))
+        retiradas = 0
+        with self._lock, self._conn:
+            if reemplaza is not None:
+                # Misma transacción: nunca se sirven a la vez la versión vieja y la nueva
+                self._fill_hashes(df["hash"].tolist())
+                retiradas = self._conn.execute(
+                    "DELETE FROM propuestas WHERE origen = ? AND hash NOT IN (SELECT hash FROM _nuevos)",
+                    (reemplaza,)).rowcount
+                self._conn.execute("INSERT OR REPLACE INTO origenes VALUES (?, ?)", (reemplaza, sha))
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO propuestas ({', '.join(cols)}, origen) "
+                f"VALUES ({', '.join('?' * len(cols))}, ?)",
+                (tuple(r) + (reemplaza or nombre,) for r in rows.itertuples(index=False, name=None)))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?, ?, ?)",
+                (sha, nombre, enc, len(df), len(nuevas), datetime.now(timezone.utc).isoformat()))
+        return {"archivo": nombre, "filas": len(df), "nuevas": len(nuevas),
+                "duplicadas": len(df) - len(nuevas), "retiradas": retiradas, "repetido": False}
+
+    def _fill_hashes(self, hashes: List[int]) -> None:
+        # Tabla temporal en lugar de un IN con miles de parámetros
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS _nuevos (hash INTEGER PRIMARY KEY)")
+        self._conn.execute("DELETE FROM _nuevos")
+        self._conn.executemany("INSERT OR IGNORE INTO _nuevos VALUES (?)", ((h,) for h in hashes))
+
+    def _known_hashes(self, hashes: List[int]) -> set:
+        self._fill_hashes(hashes)
+        return {h for (h,) in self._conn.execute("SELECT p.hash FROM propuestas p JOIN _nuevos USING (hash)")}
+
+    # --- consultas ---
+
+    @property
+    def version(self) -> int:
+        """Último id: las filas nuevas siempre tienen un id mayor."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM propuestas").fetchone()[0]
+
+    @property
+    def revision(self) -> Tuple[int, int]:
+        """(último id, número de filas): cambia con cada inserción o borrado."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM propuestas").fetchone()
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            return [i for (i,) in self._conn.execute("SELECT id FROM propuestas")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM propuestas").fetchone()[0]
+
+    @staticmethod
+    def _where(candidato=None, partido=None, tema=None, desde=None, hasta=None, ids=None,
+               desde_id=None, con_meta=False) -> Tuple[str, list]:
+        conds, params = [], []
+        for col, val in (("candidato", candidato), ("partido", partido), ("tema", tema)):
+            if val is not None:
+                conds.append(f"{col} = ?")
+                params.append(val)
+        if desde is not None:
+            conds.append("fecha >= ?")
+            params.append(str(desde))
+        if hasta is not None:
+            conds.append("fecha <= ?")
+            params.append(str(hasta))
+        if ids is not None:
+            ids = [int(i) for i in ids]
+            conds.append(f"id IN ({','.join('?' * len(ids))})" if ids else "0")
+            params.extend(ids)
+        if desde_id is not None:
+            conds.append("id > ?")
+            params.append(int(desde_id))
+        if con_meta:
+            conds.append("meta_valor IS NOT NULL")
+        return (" WHERE " + " AND ".join(conds)) if conds else "", params
+
+    def consultar(self, columns: Optional[Iterable[str]] = None, limit: Optional[int] = None,
+                  **filtros) -> pd.DataFrame:
+        """
+        Propuestas que cumplen los filtros (candidato, partido, tema, desde/hasta
+        fecha, ids, desde_id, con_meta), indexadas por id y ordenadas por id.
+        """
+        cols = list(columns) if columns is not None else PROPOSAL_COLS + META_COLS
+        where, params = self._where(**filtros)
+        sql = f"SELECT id, {', '.join(cols)} FROM propuestas{where} ORDER BY id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params, index_col="id")
+        return _tipar(df)
+
+    def contar(self, **filtros) -> int:
+        where, params = self._where(**filtros)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM propuestas{where}", params).fetchone()[0]
+
+    def valores(self, col: str, **filtros) -> List[str]:
+        """Valores distintos de candidato/partido/tema (resueltos con su índice)."""
+        if col not in FILTER_COLS:
+            raise ValueError(f"Columna no filtrable: {col}")
+        where, params = self._where(**filtros)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT {col} FROM propuestas{where} ORDER BY {col}", params)
+            return [v for (v,) in rows if v]
+
+
+def _tipar(df: pd.DataFrame) -> pd.DataFrame:
+    types = {"meta_valor": float, "meta_horizonte": "Int64", "meta_anio": "Int64"}
+    df = df.astype({c: t for c, t in types.items() if c in df.columns})
+    if "menciona_reduccion" in df.columns:
+        df["menciona_reduccion"] = df["menciona_reduccion"].fillna(0).astype(bool)
+    return df
@@ -0,0 +1,128 @@
+# modules/proyeccion.py
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+N_ESCENARIOS = 2000
+HORIZONTE_DEFAULT = 5    # un periodo de gobierno si la propuesta no fija plazo
+HORIZONTE_MAX = 30
+VENTANA_HISTORIA = 20    # años de historia usados para estimar las tasas
+BLOQUE_CELDAS = 2_000_000  # escenarios × metas por bloque (acota la memoria de resumen())
+
+
+def _tasas_log(serie: Optional[pd.Series], ventana: int) -> np.ndarray:
+    """Variaciones anuales en log de los últimos 'ventana' años (solo años consecutivos)."""
+    if serie is None:
+        return np.empty(0)
+    s = serie.dropna()
+    s = s[s > 0].sort_index().iloc[-(ventana + 1):]
+    years = s.index.to_numpy()
+    tasas = np.diff(np.log(s.to_numpy(dtype=float)))
+    return tasas[np.diff(years) == 1]
+
+
+class MotorEscenarios:
+    """
+    Proyección Monte Carlo de las metas de pobreza de los candidatos.
+
+    Al construirlo se simulan, una sola vez, 'n' escenarios de 'horizonte_max' años:
+      - crecimiento de la población: tasa media por escenario (incertidumbre del
+        promedio histórico de SP.POP.TOTL) más ruido anual con la volatilidad histórica
+      - choque económico: factor multiplicativo sobre la tasa de pobreza, paseo
+        aleatorio con la volatilidad interanual histórica de la pobreza (deriva 0:
+        la trayectoria de la meta es el escenario central)
+
+    Las metas se evalúan después con operaciones vectorizadas sobre esas matrices
+    (escenarios × metas, por bloques de BLOQUE_CELDAS, o escenarios × años).
+    """
+
+    def __init__(self, poblacion: pd.Series, pobreza: Optional[pd.Series] = None, n: int = N_ESCENARIOS,
+                 horizonte_max: int = HORIZONTE_MAX, seed: int = 0, ventana: int = VENTANA_HISTORIA):
+        rng = np.random.default_rng(seed)
+        self.n = n
+        self.horizonte_max = horizonte_max
+
+        g = _tasas_log(poblacion, ventana)
+        mu, sigma = (float(g.mean()), float(g.std(ddof=1))) if len(g) > 1 else (0.0, 0.0)
+        mu_s = rng.normal(mu, sigma / np.sqrt(max(len(g), 1)), size=(n, 1))
+        anual = mu_s + rng.normal(0.0, sigma, size=(n, horizonte_max))
+        # factor[s, t] respecto al año base (t = 0 -> 1)
+        self.crecimiento = np.exp(np.concatenate([np.zeros((n, 1)), np.cumsum(anual, axis=1)], axis=1))
+
+        e = _tasas_log(pobreza, ventana)
+        sigma_e = float(e.std(ddof=1)) if len(e) > 1 else 0.0
+        choques = rng.normal(0.0, sigma_e, size=(n, horizonte_max))
+        self.choque = np.exp(np.concatenate([np.zeros((n, 1)), np.cumsum(choques, axis=1)], axis=1))
+        self.parametros = {"crecimiento_medio": mu, "crecimiento_sd": sigma, "choque_sd": sigma_e}
+        # Solo lectura: el motor se comparte entre sesiones
+        self.crecimiento.flags.writeable = False
+        self.choque.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.crecimiento.nbytes + self.choque.nbytes
+
+    def _horizontes(self, horizontes) -> np.ndarray:
+        h = pd.to_numeric(pd.Series(horizontes, dtype="object"), errors="coerce").to_numpy(dtype=float)
+        h = np.where(np.isnan(h), HORIZONTE_DEFAULT, h)
+        return np.clip(h, 1, self.horizonte_max).astype(int)
+
+    def resumen(self, actual_pct: float, poblacion_base: float, metas_pct, horizontes,
+                anio_base: int, index=None) -> pd.DataFrame:
+        """
+        Una fila por meta: reducción anual implícita y personas que salen de la
+        pobreza al llegar al horizonte (mediana y percentiles 10/90 entre escenarios),
+        comparado con mantener la tasa actual bajo el mismo escenario.
+        """
+        meta = np.asarray(metas_pct, dtype=float)
+        h = self._horizontes(horizontes)
+        paso = max(1, BLOQUE_CELDAS // self.n)
+        partes = [self._resumen_bloque(actual_pct, poblacion_base, meta[i:i + paso], h[i:i + paso])
+                  for i in range(0, len(meta), paso)]
+        out = {k: np.concatenate([p[k] for p in partes]) if partes else np.empty(0)
+               for k in ("poblacion_p50", "pobres_meta_p50", "salen_p10", "salen_p50", "salen_p90")}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relativa = np.where((actual_pct > 0) & (meta > 0),
+                                (1 - (meta / actual_pct) ** (1.0 / h)) * 100.0,
+                                np.where(meta <= 0, 100.0, np.nan))
+        return pd.DataFrame({
+            "nivel_meta": meta,
+            "horizonte": h,
+            "anio_meta": anio_base + h,
+            "reduccion_anual_pp": (actual_pct - meta) / h,
+            "reduccion_anual_rel": relativa,
+            **out,
+        }, index=index)
+
+    def _resumen_bloque(self, actual_pct: float, poblacion_base: float, meta: np.ndarray, h: np.ndarray) -> dict:
+        # (escenarios, metas): factores en el año de cada meta
+        pob = poblacion_base * self.crecimiento[:, h]
+        choque = self.choque[:, h]
+        # Tasas acotadas a 0-100 igual que en bandas(): lo que sale nunca supera la población
+        pobres = np.clip(meta * choque, 0, 100) / 100.0 * pob
+        salen = np.clip(actual_pct * choque, 0, 100) / 100.0 * pob - pobres
+        p10, p50, p90 = np.quantile(salen, [0.1, 0.5, 0.9], axis=0)
+        return {"poblacion_p50": np.median(pob, axis=0), "pobres_meta_p50": np.median(pobres, axis=0),
+                "salen_p10": p10, "salen_p50": p50, "salen_p90": p90}
+
+    def bandas(self, actual_pct: float, poblacion_base: float, meta_pct: float, horizonte,
+               anio_base: int) -> pd.DataFrame:
+        """
+        Trayectoria año a año de una meta (reducción lineal en puntos hasta el
+        horizonte): personas en pobreza con la meta y sin cambios,
+        percentiles 10/50/90 entre escenarios.
+        """
+        h = int(self._horizontes([horizonte])[0])
+        t = np.arange(h + 1)
+        camino = actual_pct - (actual_pct - meta_pct) * t / h
+        pob = poblacion_base * self.crecimiento[:, :h + 1]
+        choque = self.choque[:, :h + 1]
+        con_meta = np.clip(camino[None, :] * choque, 0, 100) / 100.0 * pob
+        sin_cambio = np.clip(actual_pct * choque, 0, 100) / 100.0 * pob
+        q = np.quantile(np.stack([con_meta, sin_cambio]), [0.1, 0.5, 0.9], axis=1)   # (3, 2, años)
+        return pd.DataFrame({
+            "year": anio_base + t,
+            "tasa_meta": camino,
+            "pobres_p10": q[0, 0], "pobres_p50": q[1, 0], "pobres_p90": q[2, 0],
+            "sin_cambio_p10": q[0, 1], "sin_cambio_p50": q[1, 1], "sin_cambio_p90": q[2, 1],
+        })
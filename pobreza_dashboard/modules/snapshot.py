@@ -0,0 +1,158 @@
+# modules/snapshot.py
+import os
+import json
+import shutil
+import hashlib
+import threading
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+from modules import telemetria
+from modules.compartido import cache, vista
+
+# Instantánea offline: un directorio por versión con una tabla Arrow IPC por
+# conjunto de datos y un manifest.json; CURRENT apunta a la versión activa.
+SNAPSHOT_DIR = os.environ.get("POBREZA_SNAPSHOT_DIR", "data/snapshot")
+# Sin red: las páginas leen solo de la instantánea (hosts aislados)
+OFFLINE = os.environ.get("POBREZA_OFFLINE", "").lower() in ("1", "true", "yes")
+FORMATO = 1
+VERSIONES_CONSERVADAS = 3
+
+_lock = threading.Lock()
+_actual: Dict[str, object] = {"clave": None, "snapshot": None}
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Snapshot:
+    """
+    Instantánea abierta. Las tablas se leen con memory map (sin parsear ni copiar
+    los buffers de Arrow) la primera vez que se piden; frame() convierte a pandas
+    una sola vez por tabla y entrega una vista sin copia (solo lectura) de la caché
+    compartida del proceso.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("formato") != FORMATO:
+            raise ValueError(f"Formato de instantánea no soportado: {self.manifest.get('formato')}")
+        self.version: str = self.manifest["version"]
+        self._tables: Dict[str, pa.Table] = {}
+
+    @property
+    def tablas(self) -> List[str]:
+        return list(self.manifest["tablas"])
+
+    def has(self, name: str) -> bool:
+        return name in self.manifest["tablas"]
+
+    def table(self, name: str) -> pa.Table:
+        table = self._tables.get(name)
+        if table is None:
+            with telemetria.span("snapshot.map", tabla=name):
+                source = pa.memory_map(os.path.join(self.path, name + ".arrow"), "r")
+                table = pa.ipc.open_file(source).read_all()
+            self._tables[name] = table
+        return table
+
+    def frame(self, name: str) -> pd.DataFrame:
+        return vista(cache.get(("snapshot", self.path, name), lambda: self.table(name).to_pandas(),
+                               nombre="snapshot"))
+
+
+def _write_table(df: pd.DataFrame, path: str) -> int:
+    # Sin compresión: es lo que permite leer los buffers directamente del mapa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return table.num_rows
+
+
+def escribir_snapshot(tablas: Dict[str, pd.DataFrame], root: str = SNAPSHOT_DIR,
+                      fuentes: Optional[Dict[str, str]] = None, extra: Optional[dict] = None) -> str:
+    """
+    Escribe una nueva versión con las tablas dadas y la activa (CURRENT).
+
+    'fuentes' asocia tablas a archivos de origen; su hash se registra en el manifest
+    (fuente_sha256) como procedencia. Devuelve el directorio de la versión.
+    Se conservan las últimas VERSIONES_CONSERVADAS versiones.
+    """
+    fuentes = fuentes or {}
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=root, prefix=".build-")
+    try:
+        digest = hashlib.sha256()
+        meta = {}
+        for name, df in tablas.items():
+            path = os.path.join(tmp, name + ".arrow")
+            filas = _write_table(df, path)
+            sha = file_sha256(path)
+            digest.update(name.encode() + sha.encode())
+            meta[name] = {"filas": filas, "sha256": sha}
+            if name in fuentes and os.path.exists(fuentes[name]):
+                meta[name]["fuente_sha256"] = file_sha256(fuentes[name])
+        creado = datetime.now(timezone.utc)
+        version = creado.strftime("%Y%m%dT%H%M%SZ") + "-" + digest.hexdigest()[:8]
+        manifest = {"formato": FORMATO, "version": version, "creado": creado.isoformat(),
+                    "tablas": meta, **(extra or {})}
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        final = os.path.join(root, version)
+        if not os.path.exists(final):  # si existe, es la misma versión (mismo contenido)
+            os.replace(tmp, final)
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    fd, tmp_current = tempfile.mkstemp(dir=root, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_current, os.path.join(root, "CURRENT"))
+    _podar(root, version)
+    return final
+
+
+def _podar(root: str, actual: str) -> None:
+    versiones = sorted((d for d in os.listdir(root)
+                        if not d.startswith(".") and os.path.isdir(os.path.join(root, d))),
+                       key=lambda d: os.path.getmtime(os.path.join(root, d)))
+    for d in versiones[:-VERSIONES_CONSERVADAS]:
+        if d != actual:
+            shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+
+def abrir_snapshot(root: str = SNAPSHOT_DIR) -> Optional[Snapshot]:
+    """Abre la versión indicada por CURRENT, o None si no hay instantánea válida."""
+    try:
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            version = f.read().strip()
+        return Snapshot(os.path.join(root, version))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def snapshot_actual(root: str = SNAPSHOT_DIR) -> Optional[Snapshot]:
+    """
+    Instantánea activa compartida por el proceso. Se reabre solo si CURRENT cambia
+    (p. ej. tras un nuevo build), de modo que las consultas repetidas no leen disco.
+    """
+    try:
+        st = os.stat(os.path.join(root, "CURRENT"))
+        clave = (root, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+    with _lock:
+        if _actual["clave"] != clave:
+            _actual["snapshot"] = abrir_snapshot(root)
+            _actual["clave"] = clave
+        return _actual["snapshot"]
@@ -0,0 +1,132 @@
+# modules/telemetria.py
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List
+
+logger = logging.getLogger("pobreza.perf")
+
+RECENT_SPANS = 500
+_enabled = os.environ.get("POBREZA_PERF", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_recent: deque = deque(maxlen=RECENT_SPANS)
+_stats: Dict[str, List[float]] = {}   # nombre -> [n, total_s, max_s]
+_counters: Dict[str, int] = {}
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Envía a stderr los registros de 'pobreza.*': tramos (una línea JSON cada uno) y avisos de los módulos."""
+    root = logging.getLogger("pobreza")
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(level)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    with _lock:
+        _recent.clear()
+        _stats.clear()
+        _counters.clear()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "t0")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Añade atributos conocidos solo dentro del tramo (p. ej. status HTTP)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.t0
+        record = {"span": self.name, "ms": round(elapsed * 1e3, 3), "ts": time.time(), **self.attrs}
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        with _lock:
+            _recent.append(record)
+            st = _stats.setdefault(self.name, [0, 0.0, 0.0])
+            st[0] += 1
+            st[1] += elapsed
+            st[2] = max(st[2], elapsed)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        return False
+
+
+def span(name: str, **attrs):
+    """
+    Tramo temporizado: with span("wb.http", indicator=code): ...
+    Con la instrumentación desactivada devuelve un contexto vacío compartido.
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def count(name: str, n: int = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def cache_lookup(cache: str) -> None:
+    """Una consulta a la caché 'cache' (los aciertos son consultas - fallos)."""
+    count(f"cache.{cache}.lookup")
+
+
+def cache_miss(cache: str) -> None:
+    """Llamar desde dentro de la función cacheada: solo se ejecuta en los fallos."""
+    count(f"cache.{cache}.miss")
+
+
+def snapshot(slowest: int = 10) -> dict:
+    """Resumen: estadísticas por tramo, contadores, tasas de acierto y tramos recientes más lentos."""
+    with _lock:
+        stats = [{"span": k, "n": int(v[0]), "total_ms": round(v[1] * 1e3, 2),
+                  "media_ms": round(v[1] / v[0] * 1e3, 2), "max_ms": round(v[2] * 1e3, 2)}
+                 for k, v in _stats.items()]
+        counters = dict(_counters)
+        recent = list(_recent)
+    caches = {}
+    for key, lookups in counters.items():
+        if key.startswith("cache.") and key.endswith(".lookup"):
+            cache = key[len("cache."):-len(".lookup")]
+            misses = counters.get(f"cache.{cache}.miss", 0)
+            hits = max(lookups - misses, 0)
+            caches[cache] = {"consultas": lookups, "aciertos": hits, "fallos": misses,
+                             "tasa_acierto": round(hits / lookups, 3) if lookups else None}
+    stats.sort(key=lambda s: s["total_ms"], reverse=True)
+    recent.sort(key=lambda r: r["ms"], reverse=True)
+    return {"tramos": stats, "contadores": counters, "caches": caches, "mas_lentos": recent[:slowest]}
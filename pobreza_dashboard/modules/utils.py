@@ -1,7 +1,7 @@
 # modules/utils.py
 import unicodedata
 import pandas as pd
-from typing import Tuple, List
+from typing import Dict, Tuple, List
 
 # Sinónimos de columnas
 COL_SYNONYMS = {
@@ -13,6 +13,7 @@ COL_SYNONYMS = {
     "epov":   ["epov", "pobreza extrema", "extrema_pobreza", "epov"]
 }
 REQUIRED_COLS = ["region", "year", "nvpov", "vpov", "pov", "epov"]
+PROPOSAL_COLS = ["candidato", "partido", "tema", "propuesta", "fuente", "fecha"]
 
 
 def normalize_str(s: str) -> str:
@@ -21,19 +22,28 @@ def normalize_str(s: str) -> str:
     return s
 
 
-def match_columns(df: pd.DataFrame) -> pd.DataFrame:
-    cols_norm = {normalize_str(c): c for c in df.columns}
+def column_mapping(columns) -> Dict:
+    """Columna original -> nombre estándar según COL_SYNONYMS (sin tocar datos)."""
+    cols_norm = {normalize_str(c): c for c in columns}
     mapping = {}
     for target, syns in COL_SYNONYMS.items():
         for s in syns:
             if s in cols_norm:
                 mapping[cols_norm[s]] = target
                 break
-    df2 = df.rename(columns=mapping)
+    return mapping
+
+
+def match_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df2 = df.rename(columns=column_mapping(df.columns))
     return df2
 
 
 def validate_dataframe(df: pd.DataFrame) -> Tuple[bool, List[str]]:
+    """
+    Comprueba columnas obligatorias y tipos sin modificar 'df'.
+    Para un informe por filas de paneles grandes usar validacion.validar_panel.
+    """
     msgs = []
     ok = True
     for c in REQUIRED_COLS:
@@ -41,23 +51,33 @@ def validate_dataframe(df: pd.DataFrame) -> Tuple[bool, List[str]]:
             ok = False
             msgs.append(f"Falta la columna obligatoria: '{c}'")
     if ok:
-        # Validaciones básicas
-        try:
-            df['year'] = pd.to_numeric(df['year'], errors='coerce').astype('Int64')
-        except Exception:
-            ok = False
-            msgs.append("La columna 'year' debe ser numérica (ej. 2019).")
-        for c in ["nvpov","vpov","pov","epov"]:
-            if c in df.columns:
-                try:
-                    df[c] = pd.to_numeric(df[c], errors='coerce')
-                except Exception:
-                    ok = False
-                    msgs.append(f"La columna '{c}' debe ser numérica.")
-        df['region'] = df['region'].astype(str)
+        # Validaciones básicas (valores no vacíos que no se pueden convertir)
+        for c in ["year", "nvpov", "vpov", "pov", "epov"]:
+            bad = pd.to_numeric(df[c], errors='coerce').isna() & df[c].notna()
+            if bad.any():
+                ok = False
+                ejemplo = " (ej. 2019)" if c == "year" else ""
+                msgs.append(f"La columna '{c}' debe ser numérica{ejemplo}: {int(bad.sum())} valor(es) no numéricos.")
     return ok, msgs
 
 
+def read_proposals_csv(path) -> pd.DataFrame:
+    """CSV de propuestas en UTF-8, con respaldo latin1."""
+    try:
+        return pd.read_csv(path)
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding="latin1")
+
+
+def normalize_proposals(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas en minúsculas y sin espacios; añade vacías las de PROPOSAL_COLS que falten."""
+    df = df.rename(columns={c: str(c).strip().lower() for c in df.columns})
+    for e in PROPOSAL_COLS:
+        if e not in df.columns:
+            df[e] = ""
+    return df
+
+
 def peru_total(df: pd.DataFrame) -> pd.DataFrame:
     agg = df.groupby('year', as_index=False)[["nvpov","vpov","pov","epov"]].sum()
     agg.insert(0, 'region', 'Perú (suma nacional)')
@@ -0,0 +1,180 @@
+# modules/validacion.py
+from datetime import date
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from modules.utils import column_mapping, REQUIRED_COLS
+
+COUNT_COLS = ["nvpov", "vpov", "pov", "epov"]
+TOTAL_SYNONYMS = ["total", "poblacion", "population", "pob_total"]
+CHUNK_ROWS = 250_000
+MAX_ERRORS = 10_000
+YEAR_RANGE = (1950, date.today().year + 1)
+ERROR_COLS = ["fila", "columna", "regla", "valor"]
+
+MENSAJES = {
+    "faltante": "Valor vacío en la columna '{col}'",
+    "tipo": "La columna '{col}' debe ser numérica",
+    "negativo": "La columna '{col}' no admite valores negativos",
+    "anio_entero": "La columna 'year' debe contener años enteros",
+    "anio_rango": "Año fuera del rango plausible {lo}-{hi}",
+    "epov_mayor_pov": "Pobreza extrema (epov) mayor que pobreza (pov)",
+    "suma_total": "nvpov + vpov + pov no coincide con el total",
+    "duplicado": "Combinación region/year repetida",
+}
+
+Source = Union[pd.DataFrame, str, Iterable[pd.DataFrame]]
+
+
+def iter_chunks(source: Source, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Recorre la fuente por bloques de 'chunksize' filas:
+      - DataFrame: vistas por posición (sin copiar)
+      - ruta .parquet: lotes de pyarrow
+      - ruta .csv: pd.read_csv con chunksize
+      - cualquier iterable de DataFrames
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, str) and source.lower().endswith(".parquet"):
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif isinstance(source, str):
+        with pd.read_csv(source, chunksize=chunksize, dtype=str) as reader:
+            yield from reader
+    else:
+        yield from source
+
+
+def _missing(s: pd.Series) -> pd.Series:
+    miss = s.isna()
+    if s.dtype == object:
+        try:
+            blank = s.str.strip().eq("")
+        except AttributeError:
+            # columna mixta (números y texto): .str no aplica
+            blank = s.astype(str).str.strip().eq("")
+        miss |= blank.fillna(False).astype(bool)
+    return miss
+
+
+class _Collector:
+    """Acumula errores por regla con un tope de filas detalladas (memoria acotada)."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.stored = 0
+        self.parts: List[pd.DataFrame] = []
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self.examples: Dict[Tuple[str, str], List[int]] = {}
+
+    def flag(self, mask: pd.Series, col: str, rule: str, values: pd.Series, offset: int) -> None:
+        pos = np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False))
+        if len(pos) == 0:
+            return
+        key = (col, rule)
+        self.counts[key] = self.counts.get(key, 0) + len(pos)
+        ex = self.examples.setdefault(key, [])
+        if len(ex) < 3:
+            ex.extend((pos[:3 - len(ex)] + offset).tolist())
+        room = self.max_errors - self.stored
+        if room <= 0:
+            return
+        pos = pos[:room]
+        self.parts.append(pd.DataFrame({
+            "fila": pos + offset,
+            "columna": col,
+            "regla": rule,
+            "valor": values.iloc[pos].astype(str).to_numpy(),
+        }))
+        self.stored += len(pos)
+
+    def report(self) -> pd.DataFrame:
+        if not self.parts:
+            return pd.DataFrame(columns=ERROR_COLS)
+        out = pd.concat(self.parts, ignore_index=True)
+        out["columna"] = out["columna"].astype("category")
+        out["regla"] = out["regla"].astype("category")
+        return out.sort_values("fila", kind="stable").reset_index(drop=True)
+
+
+def validar_panel(source: Source, chunksize: int = CHUNK_ROWS, max_errors: int = MAX_ERRORS,
+                  tolerancia: float = 0.01, year_range: Tuple[int, int] = YEAR_RANGE,
+                  ) -> Tuple[bool, List[str], pd.DataFrame]:
+    """
+    Valida un panel regional por bloques, con comprobaciones vectorizadas:
+      - tipos numéricos y valores vacíos en REQUIRED_COLS
+      - conteos no negativos, year entero y dentro de 'year_range'
+      - epov <= pov
+      - nvpov + vpov + pov == total (si hay columna total/poblacion), con 'tolerancia' relativa
+      - region/year sin duplicados
+
+    No copia ni modifica la entrada; los nombres de columna se resuelven con los
+    sinónimos de utils. Devuelve (ok, mensajes resumen, errores por fila), donde
+    errores tiene columnas fila (posición 0-based), columna, regla, valor y como
+    máximo 'max_errors' filas; los mensajes cuentan todas las ocurrencias.
+
+    La memoria no depende del tamaño del archivo salvo por la detección de
+    duplicados, que guarda un hash por par region/year distinto: acotada por
+    regiones × años, no por filas.
+    """
+    msgs: List[str] = []
+    errors = _Collector(max_errors)
+    seen: set = set()   # hashes region/year ya vistos (uno por par distinto)
+    colmap: Optional[Dict[str, str]] = None
+    total_col: Optional[str] = None
+    offset = 0
+    lo, hi = year_range
+
+    for chunk in iter_chunks(source, chunksize):
+        if colmap is None:
+            colmap = {std: orig for orig, std in column_mapping(chunk.columns).items()}
+            missing_cols = [c for c in REQUIRED_COLS if c not in colmap]
+            if missing_cols:
+                msgs = [f"Falta la columna obligatoria: '{c}'" for c in missing_cols]
+                return False, msgs, pd.DataFrame(columns=ERROR_COLS)
+            total_col = next((c for c in chunk.columns if str(c).strip().lower() in TOTAL_SYNONYMS), None)
+
+        raw = {c: chunk[colmap[c]] for c in REQUIRED_COLS}
+        num = {}
+        for c in ["year"] + COUNT_COLS:
+            miss = _missing(raw[c])
+            num[c] = pd.to_numeric(raw[c], errors="coerce")
+            errors.flag(miss, c, "faltante", raw[c], offset)
+            errors.flag(num[c].isna() & ~miss, c, "tipo", raw[c], offset)
+        errors.flag(_missing(raw["region"]), "region", "faltante", raw["region"], offset)
+
+        year = num["year"]
+        errors.flag(year.notna() & (year % 1 != 0), "year", "anio_entero", raw["year"], offset)
+        errors.flag((year < lo) | (year > hi), "year", "anio_rango", raw["year"], offset)
+        for c in COUNT_COLS:
+            errors.flag(num[c] < 0, c, "negativo", raw[c], offset)
+        errors.flag(num["epov"] > num["pov"], "epov", "epov_mayor_pov", raw["epov"], offset)
+
+        if total_col is not None:
+            total = pd.to_numeric(chunk[total_col], errors="coerce")
+            suma = num["nvpov"] + num["vpov"] + num["pov"]
+            errors.flag((suma - total).abs() > tolerancia * total.abs(), "total", "suma_total", total, offset)
+
+        # Duplicados region/year: hash vectorizado, comparado también con bloques anteriores.
+        # Tipos fijos: un bloque con un año vacío sale float64 y otro int64, y sus hashes no coincidirían
+        keys = pd.util.hash_pandas_object(
+            pd.DataFrame({"r": raw["region"].astype(str), "y": year.astype("float64")}), index=False)
+        hashes = keys.to_numpy().tolist()
+        previos = np.fromiter((h in seen for h in hashes), dtype=bool, count=len(hashes))
+        dup = keys.duplicated().to_numpy() | previos
+        errors.flag(pd.Series(dup, index=keys.index) & year.notna(), "region", "duplicado", raw["region"], offset)
+        seen.update(hashes)
+
+        offset += len(chunk)
+
+    if colmap is None:
+        return False, ["El panel está vacío."], pd.DataFrame(columns=ERROR_COLS)
+
+    for (col, rule), n in errors.counts.items():
+        text = MENSAJES[rule].format(col=col, lo=lo, hi=hi)
+        ejemplos = ", ".join(str(f) for f in errors.examples[(col, rule)])
+        msgs.append(f"{text}: {n:,} fila(s) (ej. filas {ejemplos}).")
+    return not errors.counts, msgs, errors.report()
@@ -1,80 +1,364 @@
 # scraping_ipe.py
 import io
+import os
+import csv
+import json
+import logging
 import zipfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import requests
 import pandas as pd
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Optional, Iterable, Sequence, Tuple
+from modules import telemetria
 
+logger = logging.getLogger("pobreza.wb")
 
-def _download_wb_indicator_csv(indicator_code: str, country_code: str = "PE") -> pd.DataFrame:
+WB_BASE_URL = os.environ.get("WB_BASE_URL", "https://api.worldbank.org/v2/en/indicator")
+WB_STORE_DIR = os.environ.get("WB_STORE_DIR", "data/wb_store")
+# (conexión, lectura): solo los fallos de conexión se reintentan, así un servidor
+# colgado cuesta como mucho una espera de lectura (peor caso < 2×30 s de antes)
+HTTP_TIMEOUT = (5, 30)
+HTTP_RETRIES = 3
+HTTP_POOL_SIZE = 8
+
+# Indicadores útiles del World Bank (código -> nombre corto de columna)
+INDICADORES_WB = {
+    "SI.POV.DDAY": "pov_pct",        # pobreza a $2.15/día (% población)
+    "SI.POV.LMIC": "pov_pct_365",    # pobreza a $3.65/día
+    "SI.POV.UMIC": "pov_pct_685",    # pobreza a $6.85/día
+    "SI.POV.NAHC": "pov_pct_nac",    # pobreza según línea nacional
+    "SI.POV.GINI": "gini",
+    "SP.POP.TOTL": "population",
+}
+
+
+def build_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                  backoff: float = 0.5) -> requests.Session:
     """
-    Descarga el ZIP del World Bank para el indicador dado y devuelve el CSV principal como DataFrame.
-    Maneja la codificación 'latin1' para evitar UnicodeDecodeError.
+    Sesión HTTP con pool de conexiones y reintentos con backoff exponencial
+    ante errores de conexión, 429 y 5xx (no ante timeouts de lectura). Pensada
+    para compartirse entre hilos.
     """
-    url = f"https://api.worldbank.org/v2/en/indicator/{indicator_code}?downloadformat=csv"
-    resp = requests.get(url, timeout=30)
-    resp.raise_for_status()
-    z = zipfile.ZipFile(io.BytesIO(resp.content))
+    retry = Retry(
+        total=retries,
+        read=0,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _indicator_url(indicator_code: str, base_url: Optional[str] = None) -> str:
+    return f"{(base_url or WB_BASE_URL).rstrip('/')}/{indicator_code}?downloadformat=csv"
+
+
+def _open_wb_csv(z: zipfile.ZipFile):
+    """Abre el miembro API_*.csv del ZIP del World Bank como texto (latin1)."""
     # Encontrar el archivo API_*.csv dentro del ZIP
     csv_files = [f for f in z.namelist() if f.startswith("API_") and f.endswith(".csv")]
     if not csv_files:
         raise FileNotFoundError("No se encontró el CSV dentro del ZIP del World Bank.")
-    csv_name = csv_files[0]
-    with z.open(csv_name) as f:
-        df = pd.read_csv(f, skiprows=4, encoding="latin1")
-    # Filtrar por país
-    df = df[df["Country Code"] == country_code]
-    return df
+    return io.TextIOWrapper(z.open(csv_files[0]), encoding="latin1", newline="")
 
 
-def descargar_datos_pobreza_peru(compute_counts: bool = True) -> pd.DataFrame:
+def _iter_wb_rows(f, country_codes: Optional[Iterable[str]] = None,
+                  years: Optional[Iterable[int]] = None):
     """
-    Retorna DataFrame con columnas:
-      - year (int)
-      - pov_pct (float)  -> porcentaje de población bajo la línea internacional (SI.POV.DDAY)
-      - population (int) -> si compute_counts=True: población total (SP.POP.TOTL)
-      - pov_count (float)-> si compute_counts=True: aproximación = pov_pct/100 * population
+    Recorre el CSV del World Bank fila a fila y emite tuplas (country_code, year, value)
+    solo para los países y años pedidos, saltando celdas vacías.
+    Si se piden países concretos, deja de leer en cuanto los ha visto todos.
+    """
+    reader = csv.reader(f)
+    header = None
+    for row in reader:
+        # Las primeras líneas son metadatos; la cabecera empieza por "Country Name"
+        if row and row[0] == "Country Name":
+            header = row
+            break
+    if header is None:
+        raise ValueError("El CSV del World Bank no tiene cabecera 'Country Name'.")
 
-    Si falla, devuelve DataFrame vacío.
+    code_idx = header.index("Country Code")
+    wanted_years = set(int(y) for y in years) if years is not None else None
+    year_cols = [(i, int(c)) for i, c in enumerate(header)
+                 if c.isdigit() and (wanted_years is None or int(c) in wanted_years)]
+    pending = set(country_codes) if country_codes is not None else None
+
+    for row in reader:
+        if len(row) <= code_idx:
+            continue
+        code = row[code_idx]
+        if pending is not None:
+            if code not in pending:
+                continue
+            pending.discard(code)
+        for i, year in year_cols:
+            if i < len(row) and row[i] != "":
+                try:
+                    yield code, year, float(row[i])
+                except ValueError:
+                    pass
+        if pending is not None and not pending:
+            break
+
+
+def _parse_wb_zip(content: bytes, country_codes: Optional[Iterable[str]] = None,
+                  years: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    Parsea en una sola pasada el ZIP del World Bank a formato largo
+    (country_code, year, value), conservando solo los países/años pedidos.
+    La memoria depende de las filas conservadas, no del tamaño del CSV.
+    """
+    codes, yrs, vals = [], [], []
+    with zipfile.ZipFile(io.BytesIO(content)) as z, _open_wb_csv(z) as f:
+        for code, year, value in _iter_wb_rows(f, country_codes, years):
+            codes.append(code)
+            yrs.append(year)
+            vals.append(value)
+    long = pd.DataFrame({
+        "country_code": pd.Categorical(codes),
+        "year": pd.array(yrs, dtype="int16"),
+        "value": pd.array(vals, dtype="float64"),
+    })
+    return long.sort_values(["country_code", "year"]).reset_index(drop=True)
+
+
+class IndicatorStore:
+    """
+    Almacén local de indicadores del World Bank.
+
+    Cada indicador se guarda ya en formato largo (country_code, year, value) en un
+    Parquet propio, junto a un JSON con el ETag/Last-Modified de la última descarga.
+    En cada consulta se revalida con una petición condicional: si el servidor
+    responde 304 se lee el Parquet local sin volver a descargar ni parsear el ZIP.
+    Si la red falla y hay copia local, se sirve la copia local.
+    """
+
+    def __init__(self, root: str = WB_STORE_DIR, base_url: Optional[str] = None,
+                 session: Optional[requests.Session] = None, timeout: Tuple[float, float] = HTTP_TIMEOUT):
+        self.root = root
+        self.base_url = base_url
+        self.session = session
+        self.timeout = timeout
+
+    def _paths(self, indicator_code: str):
+        base = os.path.join(self.root, indicator_code)
+        return base + ".parquet", base + ".json"
+
+    def _read_meta(self, indicator_code: str) -> dict:
+        _, meta_path = self._paths(indicator_code)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def has(self, indicator_code: str) -> bool:
+        data_path, _ = self._paths(indicator_code)
+        return os.path.exists(data_path)
+
+    def read(self, indicator_code: str, country_codes: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Lee el indicador desde disco, opcionalmente solo para algunos países."""
+        data_path, _ = self._paths(indicator_code)
+        filters = None
+        if country_codes is not None:
+            filters = [("country_code", "in", list(country_codes))]
+        return pd.read_parquet(data_path, filters=filters)
+
+    def write(self, indicator_code: str, long: pd.DataFrame, headers=None) -> None:
+        """Escribe el Parquet y sus metadatos de forma atómica (tmp + replace)."""
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(indicator_code)
+        headers = headers or {}
+        meta = {
+            "indicator": indicator_code,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "rows": int(len(long)),
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".parquet.tmp")
+        os.close(fd)
+        try:
+            long.to_parquet(tmp, index=False)
+            os.replace(tmp, data_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def get(self, indicator_code: str, country_codes: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Devuelve el indicador en formato largo, revalidando contra el servidor.
+        Descarga completa solo si no hay copia local o si el servidor indica cambios.
+        """
+        have_local = self.has(indicator_code)
+        headers = {}
+        if have_local:
+            meta = self._read_meta(indicator_code)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        http = self.session or requests
+        url = _indicator_url(indicator_code, self.base_url)
+        telemetria.cache_lookup("wb_store")
+        try:
+            with telemetria.span("wb.http", indicator=indicator_code, conditional=bool(headers)) as sp:
+                resp = http.get(url, headers=headers, timeout=self.timeout)
+                sp.set(status=resp.status_code, bytes=len(resp.content))
+            if resp.status_code == 304 and have_local:
+                with telemetria.span("wb.store_read", indicator=indicator_code):
+                    return self.read(indicator_code, country_codes)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            if have_local:
+                # Sin red o error del servidor: servir la última copia buena
+                logger.warning("Sirviendo copia local de %s: %s", indicator_code, e)
+                telemetria.count("wb.stale_served")
+                return self.read(indicator_code, country_codes)
+            telemetria.cache_miss("wb_store")
+            raise
+
+        # Se guardan todos los países: una consulta posterior de países pares
+        # se resuelve leyendo el Parquet, sin volver a parsear el ZIP.
+        telemetria.cache_miss("wb_store")
+        with telemetria.span("wb.parse_zip", indicator=indicator_code) as sp:
+            long = _parse_wb_zip(resp.content)
+            sp.set(rows=len(long))
+        with telemetria.span("wb.store_write", indicator=indicator_code):
+            self.write(indicator_code, long, resp.headers)
+        if country_codes is not None:
+            long = long[long["country_code"].isin(list(country_codes))].reset_index(drop=True)
+        return long
+
+
+_default_store: Optional[IndicatorStore] = None
+
+
+def get_store() -> IndicatorStore:
+    """Almacén compartido por defecto (WB_STORE_DIR / WB_BASE_URL) con sesión con pool."""
+    global _default_store
+    if _default_store is None:
+        _default_store = IndicatorStore(session=build_session())
+    return _default_store
+
+
+def descargar_indicadores(indicator_codes: Sequence[str], country_codes: Sequence[str] = ("PER",),
+                          max_workers: int = 4, store: Optional[IndicatorStore] = None) -> pd.DataFrame:
+    """
+    Descarga varios indicadores en paralelo (pool de hilos acotado) y devuelve un
+    único DataFrame largo con columnas country_code, indicator, year, value.
+
+    Cada indicador pasa por el almacén local, que comparte la sesión HTTP con pool
+    y reintentos. Si algún indicador falla se propaga la excepción.
+    """
+    codes = list(dict.fromkeys(indicator_codes))
+    countries = list(dict.fromkeys(country_codes))
+    store = store or get_store()
+    if not codes:
+        return pd.DataFrame(columns=["country_code", "indicator", "year", "value"])
+
+    workers = max(1, min(max_workers, len(codes)))
+    with telemetria.span("wb.fetch_all", indicators=len(codes), countries=len(countries)), \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wb-fetch") as ex:
+        futures = {code: ex.submit(store.get, code, countries) for code in codes}
+        frames = [fut.result().assign(indicator=code) for code, fut in futures.items()]
+
+    df = pd.concat(frames, ignore_index=True)
+    df["country_code"] = df["country_code"].astype(str).astype("category")
+    df["indicator"] = df["indicator"].astype("category")
+    df["year"] = df["year"].astype(int)
+    df = df[["country_code", "indicator", "year", "value"]]
+    return df.sort_values(["country_code", "indicator", "year"]).reset_index(drop=True)
+
+
+# Perú y sus pares regionales (códigos ISO3 / agregados del World Bank)
+PAISES_PARES = {
+    "PER": "Perú",
+    "BOL": "Bolivia",
+    "ECU": "Ecuador",
+    "COL": "Colombia",
+    "LCN": "América Latina y el Caribe",
+}
+
+
+def descargar_panel_pares(indicator_code: str = "SI.POV.DDAY",
+                          country_codes: Sequence[str] = tuple(PAISES_PARES),
+                          store: Optional[IndicatorStore] = None) -> pd.DataFrame:
+    """
+    Panel largo de un indicador para Perú y sus pares: columnas country_code,
+    country (nombre legible), year, value. Si falla, devuelve DataFrame vacío.
     """
     try:
-        # 1) Descargar indicador de pobreza (%)
-        df_pov = _download_wb_indicator_csv("SI.POV.DDAY", "PER")
-        # 2) Transformar ancho -> largo (years)
-        value_cols = [c for c in df_pov.columns if c.isdigit()]
-        df_pov_long = df_pov[["Country Name", "Country Code", "Indicator Name", "Indicator Code"] + value_cols]
-        df_pov_long = df_pov_long.melt(
-            id_vars=["Country Name", "Country Code", "Indicator Name", "Indicator Code"],
-            var_name="year",
-            value_name="pov_pct"
-        )
-        df_pov_long = df_pov_long.dropna(subset=["pov_pct"])
-        df_pov_long["year"] = df_pov_long["year"].astype(int)
-        df_pov_long["pov_pct"] = pd.to_numeric(df_pov_long["pov_pct"], errors="coerce")
-        df_pov_long = df_pov_long[["year", "pov_pct"]].sort_values("year").reset_index(drop=True)
-
-        if not compute_counts:
-            return df_pov_long
-
-        # 3) Descargar población total y calcular conteos aproximados
-        df_pop = _download_wb_indicator_csv("SP.POP.TOTL", "PER")
-        pop_value_cols = [c for c in df_pop.columns if c.isdigit()]
-        df_pop_long = df_pop[["Country Code"] + pop_value_cols].melt(
-            id_vars=["Country Code"], var_name="year", value_name="population"
-        )
-        df_pop_long = df_pop_long.dropna(subset=["population"])
-        df_pop_long["year"] = df_pop_long["year"].astype(int)
-        df_pop_long["population"] = pd.to_numeric(df_pop_long["population"], errors="coerce")
-
-        # 4) Merge
+        df = descargar_indicadores([indicator_code], country_codes, store=store)
+        df = df[["country_code", "year", "value"]].copy()
+        df["country"] = df["country_code"].astype(str).map(PAISES_PARES).fillna(df["country_code"].astype(str))
+        return df[["country_code", "country", "year", "value"]]
+    except Exception as e:
+        logger.warning("Error descargando el panel de países pares: %s", e)
+        return pd.DataFrame()
+
+
+def serie_pobreza(long: pd.DataFrame, country_code: str = "PER", compute_counts: bool = True) -> pd.DataFrame:
+    """
+    Serie ancha de un país (year, pov_pct[, population, pov_count]) a partir del
+    formato largo de descargar_indicadores. Ver descargar_datos_pobreza_peru.
+    """
+    long = long[long["country_code"] == country_code]
+
+    # 1) Indicador de pobreza (%)
+    df_pov_long = long.loc[long["indicator"] == "SI.POV.DDAY", ["year", "value"]]
+    df_pov_long = df_pov_long.rename(columns={"value": "pov_pct"}).reset_index(drop=True)
+
+    if not compute_counts:
+        return df_pov_long
+
+    # 2) Población total para calcular conteos aproximados
+    df_pop_long = long.loc[long["indicator"] == "SP.POP.TOTL", ["year", "value"]]
+    df_pop_long = df_pop_long.rename(columns={"value": "population"})
+
+    # 3) Merge
+    with telemetria.span("wb.merge"):
         df = pd.merge(df_pov_long, df_pop_long, on="year", how="left")
         df["pov_count"] = (df["pov_pct"] / 100.0) * df["population"]
         # Round for presentation
         df["pov_pct"] = df["pov_pct"].round(3)
         df["pov_count"] = df["pov_count"].round(0)
-        return df.reset_index(drop=True)
+    return df.reset_index(drop=True)
+
 
+def descargar_datos_pobreza_peru(compute_counts: bool = True,
+                                 store: Optional[IndicatorStore] = None) -> pd.DataFrame:
+    """
+    Retorna DataFrame con columnas:
+      - year (int)
+      - pov_pct (float)  -> porcentaje de población bajo la línea internacional (SI.POV.DDAY)
+      - population (int) -> si compute_counts=True: población total (SP.POP.TOTL)
+      - pov_count (float)-> si compute_counts=True: aproximación = pov_pct/100 * population
+
+    Ambos indicadores se descargan en paralelo (ver descargar_indicadores).
+    Si falla, devuelve DataFrame vacío.
+    """
+    try:
+        codes = ["SI.POV.DDAY", "SP.POP.TOTL"] if compute_counts else ["SI.POV.DDAY"]
+        long = descargar_indicadores(codes, ["PER"], store=store)
+        return serie_pobreza(long, "PER", compute_counts)
     except Exception as e:
-        # En entornos productivos querrás loggear esto en un logger.
-        print("Error descargando o procesando datos del Banco Mundial:", e)
+        logger.exception("Error descargando o procesando datos del Banco Mundial: %s", e)
+        telemetria.count("wb.errors")
         return pd.DataFrame()
@@ -0,0 +1,23 @@
+import pandas as pd
+from modules.busqueda import ProposalIndex
+
+
+def test_filas_que_solo_difieren_en_fuente():
+    df = pd.DataFrame({
+        "candidato": ["Ana", "Ana"], "partido": ["P", "P"], "tema": ["Pobreza", "Pobreza"],
+        "propuesta": ["Reducir la pobreza", "Reducir la pobreza"],
+        "fuente": ["Plan de gobierno", "Debate"],
+    }, index=pd.Index([1, 2], name="id"))
+    index = ProposalIndex()
+    assert index.add(df, hasta_id=2) == 2
+    assert sorted(index.search("pobreza").index) == [1, 2]
+
+
+def test_retain_retira_filas_borradas():
+    df = pd.DataFrame({"candidato": ["Ana", "Luis"], "propuesta": ["Reducir la pobreza", "Pobreza cero"]},
+                      index=pd.Index([1, 2], name="id"))
+    index = ProposalIndex()
+    index.add(df)
+    assert index.retain([2]) == 1
+    assert index.search("pobreza").index.tolist() == [2]
+    assert index.search("ana").empty
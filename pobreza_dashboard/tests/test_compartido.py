@@ -0,0 +1,76 @@
+import time
+import threading
+import pytest
+from modules import compartido
+from modules.compartido import SharedCache
+
+
+@pytest.fixture(autouse=True)
+def tiempos_cortos(monkeypatch):
+    monkeypatch.setattr(compartido, "REVISION_S", 0.02)
+    monkeypatch.setattr(compartido, "REINTENTO_S", 0.2)
+
+
+def _esperar(cond, timeout=3.0):
+    fin = time.time() + timeout
+    while time.time() < fin:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_refresco_fallido_conserva_valor_y_reintenta():
+    cache = SharedCache(10**6)
+    intentos = []
+
+    def construir():
+        intentos.append(time.time())
+        if len(intentos) > 1:
+            raise RuntimeError("API caída")
+        return {"v": 1}
+
+    assert cache.get("k", construir, ttl=0.1, refrescar=True) == {"v": 1}
+    assert _esperar(lambda: len(intentos) >= 3)
+    assert cache.get("k", construir, ttl=0.1, refrescar=True) == {"v": 1}
+    # Tras cada fallo se espera REINTENTO_S antes del siguiente intento
+    assert all(b - a >= 0.2 * 0.9 for a, b in zip(intentos[1:], intentos[2:]))
+    assert cache.stats()["refrescos_fallidos"] >= 2
+
+
+def test_valor_rechazado_no_reemplaza_al_bueno():
+    cache = SharedCache(10**6)
+    valores = iter([[1], [], [], [], []])
+    construir = lambda: next(valores, [])
+    assert cache.get("k", construir, ttl=0.1, refrescar=True, aceptar=bool) == [1]
+    assert _esperar(lambda: cache.stats()["refrescos_fallidos"] >= 1)
+    assert cache.get("k", construir, ttl=0.1, refrescar=True, aceptar=bool) == [1]
+    assert cache.stats()["refrescos"] == 0
+
+
+def test_un_solo_refresco_en_curso_por_clave():
+    cache = SharedCache(10**6)
+    lock = threading.Lock()
+    estado = {"en_curso": 0, "max": 0, "llamadas": 0}
+
+    def construir():
+        with lock:
+            estado["llamadas"] += 1
+            estado["en_curso"] += 1
+            estado["max"] = max(estado["max"], estado["en_curso"])
+        if estado["llamadas"] > 1:
+            time.sleep(0.3)
+        with lock:
+            estado["en_curso"] -= 1
+        return {"n": estado["llamadas"]}
+
+    cache.get("k", construir, ttl=0.1, refrescar=True)
+    time.sleep(0.12)
+    hilos = [threading.Thread(target=cache.get, args=("k", construir, 0.1), kwargs={"refrescar": True})
+             for _ in range(16)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert _esperar(lambda: cache.stats()["refrescos"] >= 1)
+    assert estado["max"] == 1
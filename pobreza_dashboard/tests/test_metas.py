@@ -0,0 +1,35 @@
+import pandas as pd
+from modules.metas import extraer_metas
+
+
+def _metas(textos):
+    return extraer_metas(pd.DataFrame({"propuesta": textos, "fecha": "2025-01-01"}))
+
+
+def test_porcentaje_sin_contexto_no_es_meta():
+    m = _metas(["Invertir 2% del PBI en programas sociales"]).iloc[0]
+    assert pd.isna(m["meta_valor"]) and pd.isna(m["meta_tipo"])
+
+
+def test_abreviaturas_de_la_plantilla():
+    m = _metas(["Reducir a 0 epov en 5 años", "Reducir pov 50% en 8 años"])
+    assert m["meta_indicador"].tolist() == ["pobreza_extrema", "pobreza"]
+    assert m["meta_valor"].tolist() == [0.0, 50.0]
+    # "Reducir pov 50%" es reducir a la mitad, no llevarla al 50%
+    assert m["meta_tipo"].tolist() == ["absoluta", "relativa"]
+
+
+def test_reduccion_directa_frente_a_nivel():
+    m = _metas(["Bajar la pobreza al 10%", "Reducir la pobreza hasta el 12%", "Disminuir la pobreza 30%"])
+    assert m["meta_tipo"].tolist() == ["absoluta", "absoluta", "relativa"]
+    assert m["meta_valor"].tolist() == [10.0, 12.0, 30.0]
+
+
+def test_memo_expulsa_sin_perder_el_lote(monkeypatch):
+    from modules import metas
+    monkeypatch.setattr(metas, "_MEMO", metas.OrderedDict())
+    monkeypatch.setattr(metas, "_MEMO_MAX", 4)
+    _metas(["a", "b", "c"])
+    m = _metas(["Reducir la pobreza al 10%", "d", "e", "a"])
+    assert len(m) == 4 and m["meta_valor"].iloc[0] == 10.0
+    assert len(metas._MEMO) <= 4
@@ -0,0 +1,34 @@
+from modules.propuestas import ProposalStore
+
+CABECERA = "candidato,partido,tema,propuesta,fuente,fecha\n"
+
+
+def _csv(*filas):
+    return (CABECERA + "".join(f + "\n" for f in filas)).encode("utf-8")
+
+
+def test_csv_del_repo_reemplaza_filas_editadas(tmp_path):
+    store = ProposalStore(str(tmp_path / "p.sqlite"))
+    repo = "data/propuestas_candidatos.csv"
+    store.ingest_bytes(_csv("Ana,P,Pobreza,Reducir la pobrez al 10%,Plan,2025-01-01",
+                            "Luis,Q,Empleo,Más empleo,Plan,2025-01-01"), repo, reemplazar=True)
+    res = store.ingest_bytes(_csv("Ana,P,Pobreza,Reducir la pobreza al 12%,Plan,2025-01-01",
+                                  "Luis,Q,Empleo,Más empleo,Plan,2025-01-01"), repo, reemplazar=True)
+    assert res["retiradas"] == 1 and res["nuevas"] == 1
+    assert store.consultar(candidato="Ana")["propuesta"].tolist() == ["Reducir la pobreza al 12%"]
+    assert len(store) == 2
+
+
+def test_subidas_solo_agregan(tmp_path):
+    store = ProposalStore(str(tmp_path / "p.sqlite"))
+    store.ingest_bytes(_csv("Ana,P,Pobreza,Uno,Plan,2025-01-01"), "subida.csv")
+    store.ingest_bytes(_csv("Ana,P,Pobreza,Dos,Plan,2025-01-01"), "subida.csv")
+    assert len(store) == 2
+
+
+def test_volver_a_una_version_anterior_del_repo(tmp_path):
+    store = ProposalStore(str(tmp_path / "p.sqlite"))
+    v1, v2 = _csv("Ana,P,Pobreza,Uno,Plan,2025-01-01"), _csv("Ana,P,Pobreza,Dos,Plan,2025-01-01")
+    for data in (v1, v2, v1):
+        store.ingest_bytes(data, "repo.csv", reemplazar=True)
+    assert store.consultar()["propuesta"].tolist() == ["Uno"]
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from modules.proyeccion import MotorEscenarios
+
+
+def _motor_volatil():
+    years = range(2000, 2024)
+    poblacion = pd.Series(np.linspace(26e6, 34e6, len(years)), index=years)
+    # Historia de pobreza muy volátil: choques grandes en la simulación
+    pobreza = pd.Series(np.where(np.arange(len(years)) % 2, 60.0, 5.0), index=years)
+    return MotorEscenarios(poblacion, pobreza, n=2000, seed=1)
+
+
+def test_salen_no_supera_poblacion():
+    motor = _motor_volatil()
+    res = motor.resumen(40.0, 34e6, [0.0, 10.0, 30.0], [5, 10, 30], 2023)
+    pob = 34e6 * motor.crecimiento[:, res["horizonte"].to_numpy()]
+    assert (res["salen_p90"].to_numpy() <= pob.max(axis=0)).all()
+
+
+def test_resumen_coincide_con_bandas():
+    motor = _motor_volatil()
+    res = motor.resumen(40.0, 34e6, [10.0], [5], 2023).iloc[0]
+    bandas = motor.bandas(40.0, 34e6, 10.0, 5, 2023).iloc[-1]
+    # Con la meta en el horizonte: mismas personas en pobreza que la banda central
+    assert np.isclose(res["pobres_meta_p50"], bandas["pobres_p50"])
@@ -0,0 +1,54 @@
+import os
+import socket
+import pytest
+import requests
+from scraping_ipe import IndicatorStore
+from benchmarks.wb_stub import WBStub
+
+IND = "SI.POV.DDAY"
+
+
+def _puerto_cerrado() -> str:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return f"http://127.0.0.1:{port}/v2/en/indicator"
+
+
+@pytest.fixture
+def stub():
+    with WBStub(n_countries=10) as s:
+        yield s
+
+
+def test_primera_descarga_escribe_parquet(stub, tmp_path):
+    store = IndicatorStore(root=str(tmp_path), base_url=stub.base_url)
+    long = store.get(IND)
+    assert not long.empty
+    assert os.path.exists(tmp_path / f"{IND}.parquet")
+    assert stub.requests[IND] == 1
+
+
+def test_revalidacion_304_lee_parquet(stub, tmp_path, monkeypatch):
+    store = IndicatorStore(root=str(tmp_path), base_url=stub.base_url)
+    first = store.get(IND, ["PER"])
+    leidos = []
+    read = store.read
+    monkeypatch.setattr(store, "read", lambda *a, **k: leidos.append(a) or read(*a, **k))
+    monkeypatch.setattr("scraping_ipe._parse_wb_zip", lambda _: pytest.fail("no debe parsear el ZIP"))
+    second = store.get(IND, ["PER"])
+    assert leidos and stub.requests[IND] == 2
+    assert second.sort_values("year").reset_index(drop=True).equals(first.sort_values("year").reset_index(drop=True))
+
+
+def test_sin_red_sirve_copia_local(stub, tmp_path):
+    IndicatorStore(root=str(tmp_path), base_url=stub.base_url).get(IND)
+    offline = IndicatorStore(root=str(tmp_path), base_url=_puerto_cerrado())
+    assert not offline.get(IND, ["PER"]).empty
+
+
+def test_sin_red_ni_copia_local_falla(tmp_path):
+    store = IndicatorStore(root=str(tmp_path), base_url=_puerto_cerrado())
+    with pytest.raises(requests.RequestException):
+        store.get(IND)
@@ -0,0 +1,16 @@
+from modules.validacion import validar_panel
+
+
+def test_duplicados_entre_bloques(tmp_path):
+    csv = tmp_path / "panel.csv"
+    csv.write_text(
+        "region,year,nvpov,vpov,pov,epov\n"
+        "Lima,2019,10,5,3,1\n"
+        "Cusco,,10,5,3,1\n"        # año vacío: este bloque se lee como float64
+        "Lima,2019,10,5,3,1\n"
+        "Piura,2020,10,5,3,1\n",
+        encoding="utf-8")
+    ok, _, reporte = validar_panel(str(csv), chunksize=2)
+    assert not ok
+    dup = reporte[reporte["regla"] == "duplicado"]
+    assert len(dup) == 1